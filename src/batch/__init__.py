@@ -0,0 +1,173 @@
+from __future__ import annotations
+from typing import Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from copy import deepcopy
+from os import makedirs
+from os.path import join
+from time import perf_counter
+import json
+import numpy as np
+from engine import Engine
+from engine.formula import FORMULAS
+from engine.checkpoint import KERNELS, SOLVERS, STEPPERS
+from engine.trajectory import TrajectoryWriter
+
+#headless scenario runs, no eel or termcolor
+#scenario (JSON):
+#   parameters: named values, substituted wherever a value is the string "$name"
+#   engine: Engine keyword arguments, integrator as a name or {"type": name, ...parameters}
+#   fields: [{name, formula, units, cutoff, skin, solver: {"type": name, ...parameters}}]
+#   ensembles: [{name, forces: {field name: magnitude}, rest_energy}]
+#   particles: [{ensemble, position, velocity}]
+#   t, steps, record_every: step size, step count, trajectory frame stride
+#   sweep: {parameter name or dotted path: [values]}, every combination runs
+DEFAULTS = {'parameters': {}, 'engine': {}, 'fields': [], 'ensembles': [], 'particles': [], 't': 1, 'steps': 1, 'record_every': 1, 'sweep': {}}
+
+def load(path: str) -> dict:
+    with open(path) as handle: scenario = json.load(handle)
+    return {**deepcopy(DEFAULTS), **scenario}
+
+def substitute(value: Any, parameters: dict) -> Any:
+    if isinstance(value, str) and value.startswith('$'):
+        if value[1:] not in parameters: raise ValueError(f'unknown scenario parameter {value}')
+        return parameters[value[1:]]
+    elif isinstance(value, dict): return {key: substitute(item, parameters) for key, item in value.items()}
+    elif isinstance(value, list): return [substitute(item, parameters) for item in value]
+    return value
+
+#a named parameter, or a dotted path into the scenario (list indices as numbers)
+def override(scenario: dict, key: str, value: Any) -> None:
+    if key in scenario['parameters']:
+        scenario['parameters'][key] = value
+        return None
+    *path, last = key.split('.')
+    target = scenario
+    for part in path: target = target[int(part)] if isinstance(target, list) else target[part]
+    if isinstance(target, list): target[int(last)] = value
+    else: target[last] = value
+
+#one scenario per combination of swept values, with the overrides that made it
+def sweep(scenario: dict, sweeps: Optional[dict[str, list]] = None) -> list[tuple[dict, dict]]:
+    sweeps = {**scenario['sweep'], **(sweeps if sweeps != None else {})}
+    keys = list(sweeps)
+    runs = []
+    for values in product(*[sweeps[key] for key in keys]):
+        run = deepcopy(scenario)
+        overrides = dict(zip(keys, values))
+        for key, value in overrides.items(): override(run, key, value)
+        runs.append((run, overrides))
+    return runs
+
+def registered(value: Any, registry: dict[str, type]) -> Any:
+    if value == None: return None
+    if isinstance(value, str): value = {'type': value}
+    parameters = dict(value)
+    name = parameters.pop('type')
+    if name not in registry: raise ValueError(f'{name} must be one of {list(registry)}')
+    return registry[name](**parameters)
+
+def build(scenario: dict) -> Engine:
+    scenario = substitute({key: value for key, value in scenario.items() if key != 'sweep'}, scenario['parameters'])
+    options = dict(scenario['engine'])
+    if 'integrator' in options and not isinstance(options['integrator'], str): options['integrator'] = registered(options['integrator'], STEPPERS)
+    engine = Engine(**options)
+    fields = {}
+    for field in scenario['fields']:
+        formula = field.get('formula', field['name'])
+        if formula not in FORMULAS: raise ValueError(f'formula must be one of {list(FORMULAS)}')
+        fields[field['name']] = engine.add_field(
+            field['name'],
+            formula = FORMULAS[formula],
+            units = field.get('units'),
+            kernel = registered(field.get('kernel'), KERNELS),
+            solver = registered(field.get('solver'), SOLVERS),
+            cutoff = field.get('cutoff'),
+            skin = field.get('skin')
+        )
+    ensembles = {}
+    for ensemble in scenario['ensembles']:
+        forces = [fields[name].has(magnitude) for name, magnitude in ensemble['forces'].items()]
+        ensembles[ensemble['name']] = engine.add_ensemble(ensemble['name'], tuple(forces), ensemble.get('rest_energy', 0))
+    for particle in scenario['particles']:
+        engine.add_particle(particle['position'], particle.get('velocity'), ensembles[particle['ensemble']])
+    return engine
+
+def closest(position: np.ndarray) -> float:
+    if len(position) < 2: return float('nan')
+    delta = position[:, np.newaxis] - position[np.newaxis]
+    distance = np.sqrt(np.einsum('ijk,ijk->ij', delta, delta))
+    distance[np.diag_indices(len(position))] = np.inf
+    return float(distance.min())
+
+#runs one scenario into name.traj under output, returning its summary row
+def simulate(scenario: dict, name: str, output: str, overrides: Optional[dict] = None) -> dict:
+    engine = build(scenario)
+    scenario = substitute(scenario, scenario['parameters'])
+    path = join(output, f'{name}.traj')
+    begin = perf_counter()
+    with TrajectoryWriter(path, engine) as trajectory:
+        trajectory.record()
+        engine.run(scenario['steps'], scenario['t'], snapshot_every = scenario['record_every'], trajectory = trajectory)
+        frames = trajectory.frames
+    wall = perf_counter() - begin
+    engine.close()
+    from engine.trajectory import Trajectory
+    run = Trajectory(path)
+    position, velocity = np.array(run.position[-1]), np.array(run.velocity[-1])
+    return {
+        'run': name,
+        **(overrides if overrides != None else {}),
+        'steps': scenario['steps'],
+        'frames': frames,
+        'time': float(engine.time),
+        'wall': wall,
+        'steps/s': scenario['steps'] / wall if wall > 0 else float('inf'),
+        'displacement': float(np.linalg.norm(position - run.position[0], axis = 1).max()) if len(position) > 0 else 0.0,
+        'speed': float(np.linalg.norm(velocity, axis = 1).mean()) if len(velocity) > 0 else 0.0,
+        'closest': closest(position),
+        'trajectory': path
+    }
+
+def __simulate__(arguments: tuple) -> dict:
+    return simulate(*arguments)
+
+#every sweep combination as an independent simulation, across workers processes
+def run(
+        scenario: dict,
+        output: str,
+        sweeps: Optional[dict[str, list]] = None,
+        workers: Optional[int] = None
+    ) -> list[dict]:
+    makedirs(output, exist_ok = True)
+    runs = sweep(scenario, sweeps)
+    arguments = [(run, f'run-{i:03d}', output, overrides) for i, (run, overrides) in enumerate(runs)]
+    if workers == 1 or len(arguments) == 1: summary = [__simulate__(argument) for argument in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as executor: summary = list(executor.map(__simulate__, arguments))
+    write(summary, join(output, 'summary.csv'))
+    return summary
+
+def columns(summary: list[dict]) -> list[str]:
+    keys = []
+    for row in summary: keys.extend([key for key in row if key not in keys])
+    return keys
+
+def cell(value: Any) -> str:
+    if isinstance(value, float): return f'{value:.6g}'
+    return str(value)
+
+def write(summary: list[dict], path: str) -> None:
+    keys = columns(summary)
+    with open(path, 'w') as handle:
+        handle.write(','.join(keys) + '\n')
+        for row in summary: handle.write(','.join([cell(row.get(key, '')) for key in keys]) + '\n')
+
+def table(summary: list[dict]) -> str:
+    keys = [key for key in columns(summary) if key != 'trajectory']
+    rows = [[cell(row.get(key, '')) for key in keys] for row in summary]
+    widths = [max([len(key), *[len(row[i]) for row in rows]]) for i, key in enumerate(keys)]
+    lines = ['  '.join([key.rjust(width) for key, width in zip(keys, widths)])]
+    lines.append('  '.join(['-' * width for width in widths]))
+    for row in rows: lines.append('  '.join([value.rjust(width) for value, width in zip(row, widths)]))
+    return '\n'.join(lines)
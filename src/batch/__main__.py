@@ -0,0 +1,29 @@
+from argparse import ArgumentParser
+import json
+from batch import load, run, table
+
+#key=value,value,... with JSON values (bare strings allowed)
+def values(text: str) -> list:
+    output = []
+    for value in text.split(','):
+        try: output.append(json.loads(value))
+        except json.JSONDecodeError: output.append(value)
+    return output
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog = 'batch', description = 'headless scenario runs and parameter sweeps')
+    parser.add_argument('scenario', help = 'scenario JSON file')
+    parser.add_argument('-o', '--output', default = 'runs', help = 'directory for trajectories and summary.csv')
+    parser.add_argument('-s', '--sweep', action = 'append', default = [], metavar = 'KEY=VALUES', help = 'parameter name or dotted path, comma separated values')
+    parser.add_argument('-w', '--workers', type = int, default = None, help = 'worker processes (default: CPU count)')
+    parser.add_argument('--steps', type = int, default = None)
+    parser.add_argument('-t', type = float, default = None, help = 'step size')
+    arguments = parser.parse_args()
+    scenario = load(arguments.scenario)
+    if arguments.steps != None: scenario['steps'] = arguments.steps
+    if arguments.t != None: scenario['t'] = arguments.t
+    sweeps = {}
+    for sweep in arguments.sweep:
+        key, _, text = sweep.partition('=')
+        sweeps[key] = values(text)
+    print(table(run(scenario, arguments.output, sweeps, arguments.workers)))
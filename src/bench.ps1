@@ -0,0 +1,2 @@
+#PowerShell benchmark script (for Microsoft Windows OS)
+python -B -m "benchmark" @args
\ No newline at end of file
@@ -0,0 +1,2 @@
+#Bash shell benchmark script (e.g for Linux OS, MacOS, etc...)
+python3 -B -m "benchmark" "$@"
\ No newline at end of file
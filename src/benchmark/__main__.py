@@ -0,0 +1,135 @@
+from argparse import ArgumentParser
+from time import perf_counter
+from datetime import datetime, timezone
+from platform import platform, python_version
+import json
+import sys
+import numpy as np
+from engine.subatomic import SubatomicEngine
+from engine.solver import BarnesHut
+from engine.util.jit import JIT
+from engine.util.numeric import numeric as numeric_backend
+from benchmark.overload import CASES, NUMERICS, namespace, measure
+
+COUNTS = [10, 100, 1000, 10000, 100000]
+#name, SubatomicEngine keyword arguments, field settings, largest particle count worth timing
+CONFIGURATIONS = [
+    ('decimal', {}, {}, 100),
+    ('float', {'numeric': 'float'}, {}, 100),
+    ('float-store', {'numeric': 'float', 'store': True}, {}, 10000),
+    ('float-store-barnes-hut', {'numeric': 'float', 'store': True}, {'solver': BarnesHut}, 10000),
+    ('float-store-cutoff', {'numeric': 'float', 'store': True}, {'cutoff': 2e-10}, 100000)
+]
+#seconds each measurement aims for
+TARGET = 1.0
+MAX_STEPS = 20
+T = 1e-18
+
+#n particles, normally distributed with a 1Å spread per 100 particles, alternating protons, electrons and neutrons
+def build(n: int, options: dict, field: dict) -> SubatomicEngine:
+    engine = SubatomicEngine(**options)
+    for key, value in field.items():
+        value = value() if isinstance(value, type) else value
+        for target in (engine.gravitational_field, engine.electrostatic_field): setattr(target, key, value)
+    ensembles = [engine.proton_ensemble, engine.electron_ensemble, engine.neutron_ensemble]
+    rng = np.random.default_rng(0)
+    spread = 1e-10 * max(n / 100, 1) ** (1 / 3)
+    for i, position in enumerate(rng.normal(0, spread, (n, 3)).tolist()):
+        engine.add_particle(position, ensemble = ensembles[i % 3])
+    return engine
+
+#per call seconds: one warm-up call, then as many calls as fit TARGET (at most MAX_STEPS), best and median
+def time_calls(call) -> dict:
+    begin = perf_counter()
+    call()
+    first = perf_counter() - begin
+    calls = int(min(max(TARGET // max(first, 1e-9), 1), MAX_STEPS))
+    timings = []
+    for _ in range(calls):
+        begin = perf_counter()
+        call()
+        timings.append(perf_counter() - begin)
+    return {'best': min(timings), 'median': float(np.median(timings)), 'calls': calls}
+
+def animate(counts: list[int]) -> list[dict]:
+    results = []
+    for name, options, field, limit in CONFIGURATIONS:
+        for n in [n for n in counts if n <= limit]:
+            engine = build(n, options, field)
+            timing = time_calls(lambda: engine.animate(T))
+            engine.close()
+            results.append({'benchmark': f'animate/{name}', 'n': n, **timing})
+            report(results[-1])
+    return results
+
+def dumps(counts: list[int]) -> list[dict]:
+    results = []
+    for name, options in (('decimal', {}), ('float-store', {'numeric': 'float', 'store': True})):
+        for n in [n for n in counts if n <= 10000]:
+            engine = build(n, options, {})
+            for suffix, call in (('', engine.dumps), ('-dynamic', lambda: engine.dumps_dynamic(array = True))):
+                results.append({'benchmark': f'dumps/{name}{suffix}', 'n': n, **time_calls(call)})
+                report(results[-1])
+    return results
+
+def vector() -> list[dict]:
+    results = []
+    for numeric, _ in NUMERICS:
+        with numeric_backend(numeric):
+            operands = namespace(numeric)
+            for name, statement in [*CASES, ('magnitude', 'a.magnitude()')]:
+                seconds = measure(statement, operands) / 1e9
+                results.append({'benchmark': f'vector/{numeric}/{name}', 'n': 1, 'best': seconds, 'median': seconds, 'calls': 100000})
+                report(results[-1])
+    return results
+
+def report(result: dict) -> None:
+    print(f'{result["benchmark"]:<40}{result["n"]:>8}{result["best"] * 1e6:>14.2f} µs', flush = True)
+
+def key(result: dict) -> str:
+    return f'{result["benchmark"]}@{result["n"]}'
+
+#best-time ratios against a baseline, regressions being slower than tolerance times the baseline
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+    previous = {key(result): result for result in baseline}
+    comparisons = []
+    for result in results:
+        if key(result) not in previous: continue
+        ratio = result['best'] / previous[key(result)]['best']
+        comparisons.append({'benchmark': key(result), 'ratio': ratio, 'regression': ratio > tolerance})
+    return comparisons
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog = 'benchmark', description = 'engine benchmark suite')
+    parser.add_argument('-o', '--output', default = None, help = 'results JSON')
+    parser.add_argument('-b', '--baseline', default = None, help = 'results JSON to compare against')
+    parser.add_argument('--tolerance', type = float, default = 1.25, help = 'slowdown ratio counted as a regression')
+    parser.add_argument('--max-n', type = int, default = max(COUNTS), help = 'largest particle count')
+    parser.add_argument('--quick', action = 'store_true', help = 'up to 1000 particles')
+    parser.add_argument('--only', choices = ['animate', 'dumps', 'vector'], action = 'append', default = None)
+    arguments = parser.parse_args()
+    counts = [n for n in COUNTS if n <= (min(arguments.max_n, 1000) if arguments.quick else arguments.max_n)]
+    suites = arguments.only if arguments.only != None else ['animate', 'dumps', 'vector']
+    results = []
+    if 'animate' in suites: results += animate(counts)
+    if 'dumps' in suites: results += dumps(counts)
+    if 'vector' in suites: results += vector()
+    document = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': python_version(),
+            'numpy': np.__version__,
+            'jit': JIT,
+            'platform': platform()
+        },
+        'results': results
+    }
+    if arguments.output != None:
+        with open(arguments.output, 'w') as handle: json.dump(document, handle, indent = 4)
+    if arguments.baseline != None:
+        with open(arguments.baseline) as handle: baseline = json.load(handle)['results']
+        comparisons = compare(results, baseline, arguments.tolerance)
+        for comparison in comparisons:
+            flag = 'REGRESSION' if comparison['regression'] else ''
+            print(f'{comparison["benchmark"]:<48}{comparison["ratio"]:>8.2f}x {flag}')
+        if any([comparison['regression'] for comparison in comparisons]): sys.exit(1)
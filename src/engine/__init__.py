@@ -1,16 +1,56 @@
 from __future__ import annotations
-from typing import Union, Callable, Optional, Any
+from typing import Union, Callable, Optional, Any, Iterable
 from engine.ludus import Ludus
 from engine.util.overload import BinaryNumericOverload
 from engine.util.typing import Number, Array, Object, decimalize
+from engine.util.numeric import Numeric, numeric as numeric_backend, sqrt
 from collections import defaultdict
 from functools import reduce
 from math import factorial as fact
-from decimal import Decimal, getcontext as decimal_context
-from termcolor import colored
+from engine.util.colour import colored
 from engine.util.log import Log
+from engine.profile import Profile
 
 class Vector(BinaryNumericOverload):
+    __slots__ = ('vector',)
+    #dedicated per-operator methods, the operator inlined, same semantics as __operation__
+    __OPERATION__ = '''
+def {name}(self, other):
+    a = self.vector
+    n = len(a)
+    if isinstance(other, Vector):
+        b = other.vector
+        if len(b) != n:
+            m = max(n, len(b))
+            a = a + [0] * (m - n)
+            b = b + [0] * (m - len(b))
+            output = [x {symbol} y for x, y in zip(a, b)]
+        elif n == 3: output = [a[0] {symbol} b[0], a[1] {symbol} b[1], a[2] {symbol} b[2]]
+        elif n == 2: output = [a[0] {symbol} b[0], a[1] {symbol} b[1]]
+        else: output = [x {symbol} y for x, y in zip(a, b)]
+    elif isinstance(other, Scalar):
+        if n == 3: output = [a[0] {symbol} other, a[1] {symbol} other, a[2] {symbol} other]
+        elif n == 2: output = [a[0] {symbol} other, a[1] {symbol} other]
+        else: output = [x {symbol} other for x in a]
+    else: return NotImplemented
+    if {is_augmented}:
+        self.vector[:] = output
+        return self
+    vector = Vector.__new__(Vector)
+    vector.vector = output
+    return vector
+'''
+    __UNARY_OPERATION__ = '''
+def {name}(self):
+    vector = Vector.__new__(Vector)
+    vector.vector = [{symbol}x for x in self.vector]
+    return vector
+'''
+
+    @classmethod
+    def namespace(parent) -> dict:
+        return {'Vector': parent, 'Scalar': Number.__args__}
+
     def __init__(self, *vector: Number) -> None:
         self.vector = list(vector)
 
@@ -25,10 +65,13 @@ class Vector(BinaryNumericOverload):
     
     def solve(vectors: Union[tuple[Vector], list[Vector]]) -> Vector:
         if len(vectors) == 0: raise ValueError
-        return reduce(lambda f, g: f + g, vectors)
+        #one copy, then accumulated in place
+        output = Vector(*vectors[0].vector) if isinstance(vectors[0], Vector) else vectors[0]
+        for vector in vectors[1:]: output += vector
+        return output
 
     def magnitude(self) -> Number:
-        return sum([scalar ** 2 for scalar in self.vector]).sqrt()
+        return sqrt(sum([scalar * scalar for scalar in self.vector]))
     
     def magnitude_mapping(self, to_magnitude: Number ) -> Vector:
         from_magnitude = self.magnitude()
@@ -53,13 +96,30 @@ class Vector(BinaryNumericOverload):
         return lambda _ = None: self
 
     def __len__(self) -> int:
-        return self.dimensionality()
+        return len(self.vector)
 
     def __repr__(self) -> str:
         return str(tuple(self.vector))
     
     def __iter__(self) -> Number:
-        for scalar in self.vector: yield scalar
+        return iter(self.vector)
+
+    #component-wise, scalars broadcast in place of a filled Vector, the shorter Vector is zero-padded
+    def __components__(self, other: Union[Vector, Number], operator: Callable) -> list[Number]:
+        vector = self.vector
+        n = len(vector)
+        if isinstance(other, Vector):
+            other = other.vector
+            if len(other) != n:
+                m = max(n, len(other))
+                vector = vector + [0] * (m - n)
+                other = other + [0] * (m - len(other))
+            elif n == 3: return [operator(vector[0], other[0]), operator(vector[1], other[1]), operator(vector[2], other[2])]
+            elif n == 2: return [operator(vector[0], other[0]), operator(vector[1], other[1])]
+            return list(map(operator, vector, other))
+        if n == 3: return [operator(vector[0], other), operator(vector[1], other), operator(vector[2], other)]
+        elif n == 2: return [operator(vector[0], other), operator(vector[1], other)]
+        return [operator(scalar, other) for scalar in vector]
 
     def __operation__(
             self,
@@ -67,18 +127,14 @@ class Vector(BinaryNumericOverload):
             operator: Callable,
             is_augmented: bool = False
         ) -> Vector:
-        if isinstance(other, Number):
-            other = Vector.fill(other, len(self))
-        if not isinstance(other, Vector): return NotImplemented
-        output = Vector()
-        for i in range(max(len(self), len(other))):
-            output_scalar = operator(*map(lambda v: v.vector[i] if i < len(v) else 0, (self, other)))
-            output.extend(output_scalar)
+        if not isinstance(other, Vector) and not isinstance(other, Number): return NotImplemented
         if is_augmented:
-            self.vector = list(output.vector)
+            #writes into the existing list, no intermediate Vector
+            self.vector[:] = self.__components__(other, operator)
             return self
-        else:
-            return output
+        output = Vector.__new__(Vector)
+        output.vector = self.__components__(other, operator)
+        return output
     
     def dumps(self) -> list:
         return [float(scalar) for scalar in self.vector]
@@ -95,7 +151,7 @@ class Kinematics:
             *higher_degrees: Vector
         ) -> None:
         self.velocity = Vector.decimalize(velocity)
-        self.degrees = [self.velocity, *Vector.decimalize(*higher_degrees)]
+        self.degrees = [self.velocity, *[Vector.decimalize(degree) for degree in higher_degrees]]
     
     def __check__(self, degree: int) -> None:
         if degree < 1: raise ValueError
@@ -114,13 +170,29 @@ class Kinematics:
         self.__check__(degree)
         #zero-based indexing
         degree -= 1
-        motion = Vector.solve((self.degrees[degree], Vector.decimalize(vector)))
-        self.degrees[degree] = motion
+        motion = self.degrees[degree]
+        if isinstance(motion, Vector): motion += Vector.decimalize(vector)
+        else: self.degrees[degree] = Vector.solve((motion, Vector.decimalize(vector)))
     
     def dumps(self) -> list:
         return [degree.dumps() if isinstance(degree, Vector) else [] for degree in self.degrees]
 
 class Force(BinaryNumericOverload):
+    #dedicated per-operator methods, the operator inlined, same semantics as __operation__
+    __OPERATION__ = '''
+def {name}(self, other):
+    if not isinstance(other, Force): return NotImplemented
+    elif self.id != other.id: raise ValueError('force must be of same field. Both GIDs must be equal')
+    magnitude = self.magnitude {symbol} other.magnitude
+    center = ((self.magnitude * self.center) {symbol} (other.magnitude * other.center)) / (self.magnitude + other.magnitude)
+    output = Force(self.id, magnitude, center)
+    if {is_augmented}:
+        self.magnitude = output.magnitude
+        self.center = output.center
+        return self
+    return output
+'''
+
     def __init__(
         self,
         id: str,
@@ -175,12 +247,23 @@ class Field:
             id: str,
             name: str,
             formula: Callable = None,
-            units: str = None
+            units: str = None,
+            kernel: Callable = None,
+            solver: Any = None,
+            cutoff: Number = None,
+            skin: Number = None
         ) -> None:
         self.id = id
         self.name = name
         self.formula = formula
         self.units = units
+        #batched counterpart of formula, over whole position and magnitude arrays
+        self.kernel = kernel if kernel != None else getattr(formula, 'kernel', None)
+        #engine.solver strategy for the kernel, exact all-pairs if None
+        self.solver = solver
+        #interaction range, beyond which pairs are skipped via neighbour lists
+        self.cutoff = cutoff
+        self.skin = skin
     
     def has(
             self,
@@ -192,6 +275,13 @@ class Field:
     def calculate_force(self, *args) -> Vector:
         if self.formula == None: return Vector(0)
         return self.formula(*args)
+
+    def calculate_forces(self, position: Any, magnitude: Any, center: Any = None, targets: Any = None) -> Any:
+        if self.kernel == None: raise NotImplementedError(f'{self.name} field has no batched kernel')
+        if self.solver != None:
+            forces = self.solver.solve(self, position, magnitude, center)
+            return forces if targets is None else forces[targets]
+        return self.kernel.pairwise(position, magnitude, center, targets = targets)
     
     __PRINTER__ = lambda name: colored(name, 'cyan')
     def __repr__(self) -> str:
@@ -219,6 +309,8 @@ class Ensemble:
         self.id = id
         self.name = name
         self.forces = []
+        #field (g)id -> force
+        self.index: dict[str, Force] = {}
         self.add_forces(forces)
         self.solve_forces()
         self.rest_energy = Vector.decimalize(rest_energy)
@@ -228,23 +320,27 @@ class Ensemble:
         elif type(forces) == tuple: forces = list(forces)
         elif not type(forces) == list: raise TypeError
         self.forces.extend(forces)
+        self.__reindex__()
     
+    def __reindex__(self) -> None:
+        self.index = {}
+        for force in self.forces: self.index.setdefault(force.id, force)
+
     def __getitem__(self, key: str) -> Force:
-        for force in self.forces:
-            if key == force.id: return force 
-        return None
+        return self.index.get(key)
+
+    #any attribute set (forces included, through the index) is a new revision, see Engine.__interactions__
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, 'revision', self.__dict__.get('revision', 0) + 1)
     
     #solve alike-forces
     def solve_forces(self) -> None:
         if len(self.forces) <= 1: return None
         fields = defaultdict(list)
-        while len(self.forces) > 1:
-            force: Force = self.forces.pop()
-            field = force.id
-            fields[field].append(force)
-        for forces in fields.values():
-            solved_force = reduce(lambda f, g: f + g, forces)
-            self.forces.append(solved_force)
+        for force in self.forces: fields[force.id].append(force)
+        self.forces = [reduce(lambda f, g: f + g, forces) for forces in fields.values()]
+        self.__reindex__()
     
     __PRINTER__ = lambda name: colored(name, 'blue')
     def __repr__(self) -> str:
@@ -273,8 +369,9 @@ class Particle:
         self.ensemble = ensemble
     
     def force(self, id: str) -> Force:
-        forces = self.ensemble.forces
-        return Force.solve([force for force in forces if force.id == id])
+        force = self.ensemble[id]
+        if force == None: raise ValueError(f'{self.ensemble} has no force in field {id}')
+        return force
 
     def __repr__(self) -> str:
         return self.id
@@ -284,38 +381,158 @@ class Particle:
             'id': self.id,
             'position': self.position.dumps(),
             'kinematics': self.kinematics.dumps(),
-            'ensemble': self.ensemble.dumps()
+            #see the dump's ensembles
+            'ensemble': self.ensemble.id if self.ensemble != None else None
         }
 
 def index_for_object(d: dict) -> Object:
     return d[Object]
 
+#one field's members, resolved once per plan
+class FieldPlan:
+    def __init__(
+            self,
+            field: Field,
+            members: list[str],
+            index: Any,
+            magnitude: Any,
+            center: Any = None,
+            particles: Optional[list[Particle]] = None
+        ) -> None:
+        self.field = field
+        #(u)ids, lined up with index: group order, or row order on the store
+        self.members = members
+        #indices into the plan's particles, or store rows
+        self.index = index
+        #each member's magnitude in the field (and, on the store, center)
+        self.magnitude = magnitude
+        self.center = center
+        self.particles = particles
+        #negated magnitudes, dividing the reaction
+        self.reaction = [-scalar for scalar in magnitude] if particles != None else None
+
+#what a step's force evaluation walks: the fields, their members and an acceleration buffer per particle
+#rebuilt only when objects, groups, interactions or store rows change
+class Plan:
+    def __init__(self, engine: Engine) -> None:
+        interactions = engine.__interactions__()
+        store = engine.store
+        self.interactions = interactions
+        self.changes = engine.changes
+        self.store_changes = store.changes if store != None else None
+        self.fields: list[FieldPlan] = []
+        #particles in any field (object engines), and their accelerations accumulated over a step
+        self.particles: list[Particle] = []
+        index: dict[str, int] = {}
+        for gid, objects in engine.groups.items():
+            field: Field = index_for_object(engine.attributes[gid])
+            if store != None:
+                rows = store.members(gid)
+                members = [store.ids[row] for row in rows.tolist()]
+                self.fields.append(FieldPlan(field, members, rows, store.magnitude[gid][rows], store.center[gid][rows]))
+                continue
+            members = list(objects)
+            particles: list[Particle] = [index_for_object(engine.objects[uid]) for uid in members]
+            for uid, particle in zip(members, particles):
+                if uid in index: continue
+                index[uid] = len(self.particles)
+                self.particles.append(particle)
+            magnitude = [
+                (interactions[particle.ensemble.id, gid] if (particle.ensemble.id, gid) in interactions else particle.force(gid)).magnitude
+                for particle in particles
+            ]
+            self.fields.append(FieldPlan(field, members, [index[uid] for uid in members], magnitude, particles = particles))
+        self.buffer = [Vector() for _ in self.particles]
+
+    def is_stale(self, engine: Engine) -> bool:
+        store = engine.store
+        return (
+            self.changes != engine.changes
+            or self.interactions is not engine.__interactions__()
+            or (store != None and self.store_changes != store.changes)
+        )
+
 class Engine(Ludus):
-    def __init__(self, precision: int = 50) -> None:
-        super().__init__(encoded = False)
+    def __init__(
+            self,
+            precision: int = 50,
+            store: bool = False,
+            dimensionality: int = 3,
+            numeric: Union[str, Numeric] = 'decimal',
+            integrator: Union[str, Any] = 'taylor',
+            workers: Optional[int] = None,
+            random_ids: bool = False
+        ) -> None:
+        super().__init__(encoded = False, random_ids = random_ids)
         self.time = 0
-        context = decimal_context()
-        context.prec = precision
+        #scalar backend, 'decimal' (arbitrary-precision, own decimal.Context) or 'float' (float64)
+        self.numeric = numeric if isinstance(numeric, Numeric) else numeric_backend(numeric, precision)
+        #optional array-backed (structure-of-arrays) particle store
+        self.store = None
+        if store:
+            from engine.store import ParticleStore
+            self.store = ParticleStore(dimensionality, self.numeric)
+        #engine.parallel process pool for store kernel fields, reused across steps
+        self.pool = None
+        if workers != None:
+            if self.store == None: raise ValueError('parallel force evaluation needs the particle store')
+            from engine.parallel import ParallelPool
+            self.pool = ParallelPool(workers)
+        #(g)id -> engine.solver.Neighbours, for fields with a cutoff
+        self.neighbours = {}
+        #(ensemble (g)id, field (g)id) -> solved force, of registered ensembles and every particle's own
+        #rebuilt after objects, groups or attributes change, or any of those ensembles is edited in place
+        self.interactions: Optional[dict[tuple[str, str], Force]] = None
+        self.interactions_changes: Optional[int] = None
+        #(ensemble, revision) the interactions were built from
+        self.revisions: list[tuple[Ensemble, int]] = []
+        #engine.integrator stepper, 'taylor', 'verlet', 'leapfrog' or 'rk4'
+        from engine.integrator import Integrator, integrator as integrator_stepper
+        self.integrator = integrator if isinstance(integrator, Integrator) else integrator_stepper(integrator)
+        #engine.profile.Profile while profiling, every hook is skipped while None
+        self.profiler = None
+        #cached Plan of the fields and their members
+        self.plan: Optional[Plan] = None
+        #((changes, ensemble revisions), fields and ensembles sections of dumps)
+        self.sections: Optional[tuple[tuple[int, list[int]], dict[str, list]]] = None
     
     def add_field(
             self,
             name: Optional[str] = None,
             formula: Callable[[Particle, Particle, Fields], Vector] = None,
-            units: str = None
+            units: str = None,
+            kernel: Callable = None,
+            solver: Any = None,
+            cutoff: Number = None,
+            skin: Number = None
         ) -> Field:
         id = self.new_group()
-        field = Field(id, name, formula, units)
+        field = Field(id, name, formula, units, kernel, solver, cutoff, skin)
+        self.__check_solver__(field)
         self.add_attribute(id, field)
+        self.interactions = None
         return field
 
     def assign_field(
         self,
         field: Field,
         formula: Callable[[Particle, Particle, Fields], Vector],
-        units: str = None
+        units: str = None,
+        kernel: Callable = None
         ) -> None:
         field.formula = formula
-        if units != None: self.units = units
+        field.kernel = kernel if kernel != None else getattr(formula, 'kernel', None)
+        if units != None: field.units = units
+        self.__check_solver__(field)
+
+    #a solver only replaces the all-pairs kernel call of store engines, anywhere else it would be silently skipped
+    #(checked again every step, as fields' solvers can be set directly)
+    def __check_solver__(self, field: Field) -> None:
+        if field.solver == None: return None
+        name = field.name if field.name != None else field.id
+        if self.store == None: raise ValueError(f'{name} field solver needs the particle store (store = True)')
+        elif field.kernel == None: raise ValueError(f'{name} field solver needs a batched kernel')
+        elif field.cutoff != None: raise ValueError(f'{name} field solver cannot be combined with a cutoff')
 
     def add_ensemble(
             self,
@@ -324,8 +541,13 @@ class Engine(Ludus):
             rest_energy: Number = 0
         ) -> Ensemble:
         id = self.new_group()
-        ensemble = Ensemble(id, name, forces, rest_energy)
+        if isinstance(forces, Force): forces = [forces]
+        with self.numeric:
+            #forces are re-cast into this engine's numeric backend
+            forces = [Force(force.id, force.magnitude, force.center) for force in forces]
+            ensemble = Ensemble(id, name, forces, rest_energy)
         self.add_attribute(id, ensemble)
+        self.interactions = None
         return ensemble
     
     def remove_ensemble(
@@ -344,29 +566,61 @@ class Engine(Ludus):
             if Ludus.is_id(id, Ludus.GID):
                 ids = [id]
             else:
-                name = id
-                for group in map(index_for_object, self.attributes.values()):
-                    if isinstance(group, Ensemble) and name == group.name:
-                        id = group.id
-                        ids.append(id)
+                ids = [gid for gid in self.named(id) if isinstance(self.attributes[gid].get(Object), Ensemble)]
             [self.clear_attributes(gid) for gid in ids]
+            self.interactions = None
         else: raise ValueError
 
     def add_particle(
             self,
             position: Union[Vector, Array],
-            kinematics: Union[Kinematics, Vector, Array] = Kinematics(),
+            kinematics: Union[Kinematics, Vector, Array, None] = None,
             ensemble: Optional[Ensemble] = None,
         ) -> Particle:
         id = self.new_object()
         if isinstance(position, Array): position = Vector(*position)
-        if isinstance(kinematics, Array): kinematics = Vector(*kinematics)
-        if isinstance(kinematics, Vector): kinematics = Kinematics(kinematics)
-        particle = Particle(id, position, kinematics, ensemble)
+        with self.numeric:
+            if kinematics == None: kinematics = Kinematics()
+            if isinstance(kinematics, Array): kinematics = Vector(*kinematics)
+            if isinstance(kinematics, Vector): kinematics = Kinematics(kinematics)
+            else: kinematics = Kinematics(*kinematics.degrees)
+            if self.store != None: particle = self.store.append(id, position, kinematics, ensemble)
+            else: particle = Particle(id, position, kinematics, ensemble)
         self.add_property(id, particle)
         self.attach_group(uid = id, gid = [force.id for force in ensemble.forces])
+        self.integrator.reset()
         return particle
     
+    #add_particle for many particles of one ensemble, positions and velocities as (n, d) arrays (or lists of rows)
+    #a single velocity applies to every particle, None is at rest
+    def add_particles(
+            self,
+            positions: Any,
+            velocities: Any = None,
+            ensemble: Optional[Ensemble] = None
+        ) -> list[Particle]:
+        n = len(positions)
+        ids = self.new_objects(n)
+        if self.store != None:
+            with self.numeric: particles = self.store.extend(ids, positions, velocities, ensemble)
+        else:
+            positions = positions.tolist() if hasattr(positions, 'tolist') else positions
+            velocities = velocities.tolist() if hasattr(velocities, 'tolist') else velocities
+            #one velocity (or none) for every particle
+            if velocities is None or isinstance(velocities, Vector) or len(velocities) == 0 or isinstance(velocities[0], Number): velocities = [velocities] * n
+            if len(velocities) != n: raise ValueError(f'expected {n} velocities')
+            particles = []
+            with self.numeric:
+                for id, position, velocity in zip(ids, positions, velocities):
+                    position = position if isinstance(position, Vector) else Vector(*position)
+                    if velocity is None: kinematics = Kinematics()
+                    else: kinematics = Kinematics(velocity if isinstance(velocity, Vector) else Vector(*velocity))
+                    particles.append(Particle(id, position, kinematics, ensemble))
+        for id, particle in zip(ids, particles): self.add_property(id, particle)
+        self.attach_groups(ids, [force.id for force in ensemble.forces] if ensemble != None else [])
+        self.integrator.reset()
+        return particles
+
     def remove_particle(
             self,
             id: Union[Ensemble, str]
@@ -378,67 +632,261 @@ class Engine(Ludus):
         """
         if isinstance(id, Particle): id = id.id
         if type(id) == str and Ludus.is_id(id, Ludus.UID):
+            if self.store != None: self.store.remove(id)
             self.remove_object(uid = id)
+            self.integrator.reset()
         else: raise ValueError
 
+    #remove_particle for many particles (or (u)ids)
+    def remove_particles(self, ids: Iterable[Union[Particle, str]]) -> None:
+        ids = list(dict.fromkeys([id.id if isinstance(id, Particle) else id for id in ids]))
+        if not all([type(id) == str and Ludus.is_id(id, Ludus.UID) for id in ids]): raise ValueError
+        #every id checked before anything is removed, so an unknown one leaves the engine untouched
+        for id in ids:
+            if id not in self.objects: raise KeyError(id)
+        if self.store != None: self.store.remove_all(ids)
+        self.remove_objects(ids)
+        self.integrator.reset()
+
     def animate(self, t: Number = 1) -> None:
-        if not isinstance(t, Decimal): t = decimalize(t)
-        self.time += t
+        profiler = self.profiler
+        with self.numeric:
+            t = decimalize(t)
+            self.time += t
+            if profiler != None: begin = profiler.begin()
+            self.integrator.step(self.__state__(), t)
+            if profiler != None:
+                profiler.end('step', begin)
+                profiler.tick()
+
+    #n steps of t in one tight loop, dumping every snapshot_every steps to callback(step, snapshot) or the returned list
+    #with an engine.trajectory.TrajectoryWriter, frames are recorded every snapshot_every (or every) step instead of dumped
+    def run(
+            self,
+            steps: int,
+            t: Number = 1,
+            snapshot_every: Optional[int] = None,
+            callback: Optional[Callable[[int, dict], Any]] = None,
+            trajectory: Any = None
+        ) -> list[dict]:
+        if steps < 0 or (snapshot_every != None and snapshot_every < 1): raise ValueError
+        snapshots = []
+        stride = snapshot_every if snapshot_every != None else 1
+        profiler = self.profiler
+        with self.numeric:
+            t = decimalize(t)
+            state = self.__state__()
+            for step in range(1, steps + 1):
+                if profiler != None: begin = profiler.begin()
+                self.integrator.step(state, t)
+                self.time += t
+                if profiler != None:
+                    profiler.end('step', begin)
+                    profiler.tick()
+                if step % stride != 0: continue
+                if trajectory != None:
+                    if profiler != None: begin = profiler.begin()
+                    trajectory.record()
+                    if profiler != None: profiler.end('trajectory', begin)
+                if snapshot_every == None or (trajectory != None and callback == None): continue
+                snapshot = self.dumps()
+                if callback == None: snapshots.append(snapshot)
+                else:
+                    callback(step, snapshot)
+                    #the callback may have added or removed particles
+                    state = self.__state__()
+        return snapshots
+
+    #per-phase timers, pair counts and allocations from now on, reported every `every` steps to report(profile) (print)
+    def start_profiling(
+            self,
+            every: Optional[int] = None,
+            report: Optional[Callable[[Profile], Any]] = None
+        ) -> Profile:
+        self.profiler = Profile(every, report)
+        return self.profiler
+
+    #the profile so far, None if not profiling
+    def stop_profiling(self) -> Optional[Profile]:
+        profiler = self.profiler
+        self.profiler = None
+        return profiler
+
+    #releases the process pool, if any
+    def close(self) -> None:
+        if self.pool != None: self.pool.close()
+        self.pool = None
+
+    #complete, versioned engine state, see engine.checkpoint
+    def checkpoint(self, path: Any) -> None:
+        from engine.checkpoint import save
+        save(self, path)
+
+    def restore(path: Any) -> Engine:
+        from engine.checkpoint import load
+        return load(path)
+
+    def __interactions__(self) -> dict[tuple[str, str], Force]:
+        if (
+                self.interactions == None
+                or self.interactions_changes != self.changes
+                or any([ensemble.revision != revision for ensemble, revision in self.revisions])
+            ):
+            #removed ensembles live on in their particles
+            ensembles = {id(ensemble): ensemble for ensemble in map(index_for_object, self.attributes.values()) if isinstance(ensemble, Ensemble)}
+            for particle in map(index_for_object, self.objects.values()):
+                if particle.ensemble != None: ensembles.setdefault(id(particle.ensemble), particle.ensemble)
+            self.interactions = {}
+            for ensemble in ensembles.values():
+                for gid, force in ensemble.index.items(): self.interactions[ensemble.id, gid] = force
+            self.revisions = [(ensemble, ensemble.revision) for ensemble in ensembles.values()]
+            self.interactions_changes = self.changes
+        return self.interactions
+
+    def __state__(self) -> Any:
+        from engine.integrator import state
+        return state(self)
+
+    #accumulates field accelerations (degree 2) at the current positions, optionally only onto target store rows
+    def __accelerate__(self, targets: Any = None) -> None:
+        profiler = self.profiler
+        if profiler != None: begin = profiler.begin()
+        if self.store != None: self.__accelerate_store__(targets)
+        elif targets is not None: raise TypeError('targeted accelerations need the particle store')
+        else: self.__accelerate_objects__()
+        if profiler != None: profiler.end('accelerate', begin)
+
+    def __plan__(self) -> Plan:
+        if self.plan == None or self.plan.is_stale(self): self.plan = Plan(self)
+        return self.plan
+
+    def __accelerate_objects__(self) -> None:
+        profiler = self.profiler
+        if profiler != None: begin = profiler.begin()
+        plan = self.__plan__()
+        buffer = plan.buffer
+        for acceleration in buffer: acceleration.vector.clear()
+        if profiler != None: begin = profiler.lap('lookup', begin)
         #for each field
-        for gid, objects in self.groups.items():
-            group = self.attributes[gid]
-            field: Field = index_for_object(group)
-            #for each particle, in field
-            for i, uid_1 in enumerate(objects):
-                object_1 = self.objects[uid_1]
-                particle_1: Particle = index_for_object(object_1)
-                # groups_1 = object_1['gid']
-                # if gid not in groups_1: continue
-                for uid_2 in objects[i+1:]:
-                    object_2 = self.objects[uid_2]
-                    particle_2: Particle = index_for_object(object_2)
-                    # groups_2 = object_2['gid']
-                    # if gid not in groups_2: continue
-                    force_vector = field.calculate_force(
-                        particle_1,
-                        particle_2,
-                        field
-                    )
-
-                    #particle 1
-                    force_1 = particle_1.force(gid)
-                    acceleration_1 = force_vector / force_1.magnitude
-                    kinematics_1 = particle_1.kinematics
-                    kinematics_1.add_motion(acceleration_1, degree = 2)
-                    #particle 2
-                    force_2 = particle_2.force(gid)
-                    acceleration_2 = force_vector / force_2.magnitude
-                    kinematics_2 = particle_2.kinematics
-                    kinematics_2.add_motion(acceleration_2, degree = 2)
-        for object in self.objects.values():
-            particle: Particle = index_for_object(object)
-            position = particle.position
-            kinematics = particle.kinematics
-            degrees = kinematics.degrees
-            #position
-            particle.position = Vector.solve([Kinematics.SERIES_FORMULA(degree, i, t) for i, degree in enumerate((position, *degrees), 1)])
-            #kinematics
-            velocity = Vector.solve([Kinematics.SERIES_FORMULA(degree, i, t) for i, degree in enumerate(degrees)])
-            kinematics.set_motion(velocity, degree = 1)
-            kinematics.set_motion(Vector(), degree = 2)
+        for group in plan.fields:
+            field, particles, index = group.field, group.particles, group.index
+            self.__check_solver__(field)
+            magnitude, reaction = group.magnitude, group.reaction
+            #for each (neighbouring) pair of particles, in field
+            for i, j in self.__pairs__(field, group.members, lambda: [particle.position for particle in particles]):
+                force_vector = field.calculate_force(
+                    particles[i],
+                    particles[j],
+                    field
+                )
+                #particle 1, and particle 2 (reaction)
+                buffer[index[i]] += force_vector / magnitude[i]
+                buffer[index[j]] += force_vector / reaction[j]
+            if profiler != None: begin = profiler.lap(Profile.field(field), begin)
+        #each particle's kinematics updated once
+        for particle, acceleration in zip(plan.particles, buffer):
+            if len(acceleration) > 0: particle.kinematics.add_motion(acceleration, degree = 2)
+        if profiler != None: profiler.end('apply', begin)
+
+    def __neighbours__(self, field: Field) -> Any:
+        if field.id not in self.neighbours:
+            from engine.solver import Neighbours
+            self.neighbours[field.id] = Neighbours(field.cutoff, field.skin)
+        return self.neighbours[field.id]
+
+    #index pairs (i, j), i < j, of members interacting through field
+    def __pairs__(
+            self,
+            field: Field,
+            members: Array,
+            positions: Callable[[], Union[list[Vector], Any]]
+        ) -> Iterable[tuple[int, int]]:
+        if field.cutoff == None:
+            n = len(members)
+            if self.profiler != None: self.profiler.count(field, n * (n - 1) // 2)
+            return ((i, j) for i in range(n) for j in range(i + 1, n))
+        from engine.solver import stack
+        position = positions()
+        if isinstance(position, list): position = stack(position)
+        i, j = self.__neighbours__(field).pairs(position, members)
+        if self.profiler != None: self.profiler.count(field, len(i))
+        return zip(i.tolist(), j.tolist())
+
+    def __accelerate_store__(self, targets: Any = None) -> None:
+        store = self.store
+        profiler = self.profiler
+        #for each field
+        for group in self.__plan__().fields:
+            if profiler != None: begin = profiler.begin()
+            self.__check_solver__(group.field)
+            rows = group.index
+            #(local indices of) rows receiving accelerations
+            receiving = store.within(rows, targets)
+            if profiler != None: begin = profiler.lap('lookup', begin)
+            self.__accelerate_field__(group.field, rows, group.magnitude, group.center, receiving)
+            if profiler != None: profiler.end(Profile.field(group.field), begin)
+
+    def __accelerate_field__(
+            self,
+            field: Field,
+            rows: Any,
+            magnitude: Any,
+            center: Any,
+            receiving: Any
+        ) -> None:
+        store = self.store
+        if field.kernel != None and field.cutoff != None:
+            #neighbour pairs only, in one array call
+            i, j = self.__neighbours__(field).pairs(store.position[rows], rows)
+            if self.profiler != None: self.profiler.count(field, len(i))
+            forces = field.kernel.pair(store.position[rows[i]], magnitude[i], store.position[rows[j]], magnitude[j], center[i], center[j])
+            if receiving is None:
+                store.accelerate(rows[i], forces / magnitude[i, None])
+                store.accelerate(rows[j], forces / -magnitude[j, None])
+                return None
+            to_i, to_j = store.among(receiving, len(rows), i), store.among(receiving, len(rows), j)
+            store.accelerate(rows[i[to_i]], forces[to_i] / magnitude[i[to_i], None])
+            store.accelerate(rows[j[to_j]], forces[to_j] / -magnitude[j[to_j], None])
+            return None
+        elif field.kernel != None:
+            #all pairs in one (tiled) array call, split across the pool if any
+            if self.profiler != None and field.solver == None:
+                n, r = len(rows), len(receiving) if receiving is not None else len(rows)
+                #pairs with at least one receiving particle
+                self.profiler.count(field, r * (n - 1) - r * (r - 1) // 2)
+            if self.pool != None and field.solver == None:
+                forces = self.pool.pairwise(field.kernel, store.position[rows], magnitude, center, receiving)
+            else: forces = field.calculate_forces(store.position[rows], magnitude, center, receiving)
+            local = receiving if receiving is not None else slice(None)
+            store.accelerate(rows[local], forces / magnitude[local, None])
+            return None
+        views = store.views
+        receives = set(receiving.tolist()) if receiving is not None else None
+        #for each (neighbouring) pair of particles, in field
+        for i, j in self.__pairs__(field, rows, lambda: store.position[rows]):
+            if receives != None and i not in receives and j not in receives: continue
+            row_1, row_2 = rows[i], rows[j]
+            force_vector = field.calculate_force(
+                views[row_1],
+                views[row_2],
+                field
+            )
+            force_vector = store.flatten(force_vector)
+            if receives == None or i in receives: store.acceleration[row_1] += force_vector / magnitude[i]
+            if receives == None or j in receives: store.acceleration[row_2] -= force_vector / magnitude[j]
 
     #literal colour
-    __TIME_LABEL__ = colored('time elapsed', on_color = 'on_black')
-    __POSITION_LABEL__ = colored('position', color = 'red')
-    __VELOCITY_LABEL__ = colored('velocity', color = 'green')
-    __ENSEMBLE_LABEL__ = colored('ensemble', color = 'blue')
-    __FIELDS_LABEL__ = colored('fields', color = 'cyan')
+    __TIME_LABEL__ = lambda: colored('time elapsed', on_color = 'on_black')
+    __POSITION_LABEL__ = lambda: colored('position', color = 'red')
+    __VELOCITY_LABEL__ = lambda: colored('velocity', color = 'green')
+    __ENSEMBLE_LABEL__ = lambda: colored('ensemble', color = 'blue')
+    __FIELDS_LABEL__ = lambda: colored('fields', color = 'cyan')
     #lambda colour
     __PARTICLE_PRINTER__ = lambda name: colored(name, color = 'magenta')
     __UNITS_PRINTER__ = lambda name: colored(name if name != None else 'a.u.', color = 'blue', attrs = ['bold'])
     def __repr__(self) -> str:
         log = Log()
-        log.pair(Engine.__TIME_LABEL__, f'{self.time}s')
+        log.pair(Engine.__TIME_LABEL__(), f'{self.time}s')
         for object in self.objects.values():
             particle: Particle = index_for_object(object)
             log.pair(
@@ -448,15 +896,15 @@ class Engine(Ludus):
             )
             log.open_section()
 
-            log.pair(Engine.__POSITION_LABEL__, str(particle.position))
+            log.pair(Engine.__POSITION_LABEL__(), str(particle.position))
 
-            log.pair(Engine.__VELOCITY_LABEL__, str(particle.kinematics.degrees[0]))
+            log.pair(Engine.__VELOCITY_LABEL__(), str(particle.kinematics.degrees[0]))
 
             ensemble: Ensemble = particle.ensemble
-            log.pair(Engine.__ENSEMBLE_LABEL__, str(ensemble))
+            log.pair(Engine.__ENSEMBLE_LABEL__(), str(ensemble))
 
             forces: list[Force] = ensemble.forces
-            log.open_list(Engine.__FIELDS_LABEL__)
+            log.open_list(Engine.__FIELDS_LABEL__())
             for force in forces:
                 object = self.attributes[force.id]
                 field: Field = index_for_object(object)
@@ -469,15 +917,89 @@ class Engine(Ludus):
             log.close_section()
         return log.log.rstrip('\n')
 
+    #fields and ensembles, serialized again only after objects, groups or attributes change,
+    #or an ensemble changes in place (Ensemble.revision, e.g. Ensemble.add_forces)
+    def __sections__(self) -> dict[str, list]:
+        objects = list(map(index_for_object, self.attributes.values()))
+        key = (self.changes, [object.revision for object in objects if isinstance(object, Ensemble)])
+        if self.sections == None or self.sections[0] != key:
+            sections = defaultdict(list)
+            for object in objects:
+                if isinstance(object, Field): sections['fields'].append(object.dumps())
+                elif isinstance(object, Ensemble): sections['ensembles'].append(object.dumps())
+            self.sections = (key, dict(sections))
+        return self.sections[1]
+
+    #ParticleView.dumps of every particle, in object order, read from the store's arrays at once
+    def __store_dumps__(self) -> list[dict]:
+        store = self.store
+        position, velocity, acceleration = store.positions().tolist(), store.velocities().tolist(), store.accelerations().tolist()
+        particles = []
+        for particle in map(index_for_object, self.objects.values()):
+            row = particle.row
+            particles.append({
+                'id': particle.id,
+                'position': position[row],
+                'kinematics': [velocity[row], acceleration[row]],
+                'ensemble': particle.ensemble.id if particle.ensemble != None else None
+            })
+        return particles
+
+    #particles reference their ensemble by id
     def dumps(self) -> dict:
-        dump = defaultdict(list)
-        for object in map(index_for_object, (*self.objects.values(), *self.attributes.values())):
-            for object_class, key in (
-                    (Particle, 'particles'),
-                    (Field, 'fields'),
-                    (Ensemble, 'ensembles')
-                ):
-                if not isinstance(object, object_class): continue
-                dump[key].append(object.dumps())
-                break
-        return dict(dump)
+        profiler = self.profiler
+        if profiler != None: begin = profiler.begin()
+        dump = {}
+        if self.store != None: particles = self.__store_dumps__()
+        else: particles = [object.dumps() for object in map(index_for_object, self.objects.values()) if isinstance(object, Particle)]
+        if len(particles) > 0: dump['particles'] = particles
+        dump.update({key: list(section) for key, section in self.__sections__().items()})
+        if profiler != None: profiler.end('dumps', begin)
+        return dump
+
+    #position (n, d) and kinematics (n, degrees, d) float64 arrays, filled row-block at a time
+    def __dynamic_arrays__(self, particles: list[Particle]) -> dict:
+        import numpy as np
+        #float backend scalars go to numpy as they are
+        convert = self.numeric.NAME != 'float'
+        positions = [particle.position.vector for particle in particles]
+        k = max([len(particle.kinematics.degrees) for particle in particles], default = 0)
+        degrees = []
+        for particle in particles:
+            vectors = [degree.vector if isinstance(degree, Vector) else [] for degree in particle.kinematics.degrees]
+            degrees.extend(vectors + [[]] * (k - len(vectors)))
+        d = max([len(vector) for vector in positions] + [len(vector) for vector in degrees], default = 0)
+        position, kinematics = np.zeros((len(particles), d)), np.zeros((len(degrees), d))
+        for output, vectors in ((position, positions), (kinematics, degrees)):
+            #complete rows in one assignment, empty ones stay zero, partial ones on their own
+            full = [i for i, vector in enumerate(vectors) if len(vector) == d]
+            values = vectors if len(full) == len(vectors) else [vectors[i] for i in full]
+            if convert: values = [[float(scalar) for scalar in vector] for vector in values]
+            if len(values) > 0: output[full] = values
+            for i, vector in enumerate(vectors):
+                if 0 < len(vector) < d: output[i, :len(vector)] = [float(scalar) for scalar in vector]
+        return {'position': position, 'kinematics': kinematics.reshape(len(particles), k, d)}
+
+    #only what changes every step: time, (u)ids, positions and kinematic degrees
+    #as lists, or (array) as float64 arrays, position (n, d) and kinematics (n, degrees, d) zero-padded
+    def dumps_dynamic(self, array: bool = False) -> dict:
+        profiler = self.profiler
+        if profiler != None: begin = profiler.begin()
+        store = self.store
+        dump = {'time': float(self.time)}
+        if store != None:
+            import numpy as np
+            dump['ids'] = list(store.ids)
+            position = store.positions().copy()
+            kinematics = np.stack((store.velocities(), store.accelerations()), axis = 1)
+            if array: dump.update({'position': position, 'kinematics': kinematics})
+            else: dump.update({'position': position.tolist(), 'kinematics': kinematics.tolist()})
+        else:
+            particles: list[Particle] = [index_for_object(object) for object in self.objects.values()]
+            dump['ids'] = [particle.id for particle in particles]
+            if array: dump.update(self.__dynamic_arrays__(particles))
+            else:
+                dump['position'] = [particle.position.dumps() for particle in particles]
+                dump['kinematics'] = [particle.kinematics.dumps() for particle in particles]
+        if profiler != None: profiler.end('dumps', begin)
+        return dump
@@ -0,0 +1,277 @@
+from __future__ import annotations
+from typing import Union, Any
+from os import PathLike
+from collections import defaultdict
+from decimal import Decimal
+from importlib import import_module
+import json
+import numpy as np
+from engine import Vector, Kinematics, Force, Field, Ensemble, Particle, Engine, index_for_object
+from engine.util.typing import Object, decimalize
+from engine.formula import FORMULAS, formula_name
+from engine.formula.kernel import InverseSquareKernel
+from engine.solver import Solver, BarnesHut
+from engine.integrator import Integrator, INTEGRATORS, Adaptive, BlockTimestep
+
+#layout: an uncompressed .npz of binary arrays, plus a JSON 'header' (engine configuration, fields, ensembles, groups)
+FORMAT = 'subatomic-checkpoint'
+VERSION = 1
+
+KERNELS = {'inverse-square': InverseSquareKernel}
+SOLVERS = {'direct': Solver, 'barnes-hut': BarnesHut}
+STEPPERS = {integrator.NAME: integrator for integrator in (*INTEGRATORS.values(), Adaptive, BlockTimestep)}
+
+def reference(value: Any, registry: dict[str, type]) -> dict:
+    for name, cls in registry.items():
+        if type(value) is cls: return {'type': name, 'parameters': encode(vars(value))}
+    raise ValueError(f'cannot checkpoint {value}, not one of {list(registry)}')
+
+def dereference(value: dict, registry: dict[str, type]) -> Any:
+    return registry[value['type']](**decode(value['parameters']))
+
+#JSON-able scalars, Decimals as strings so precision survives
+def encode(value: Any) -> Any:
+    if isinstance(value, Decimal): return {'decimal': str(value)}
+    elif isinstance(value, Vector): return {'vector': [encode(scalar) for scalar in value]}
+    elif isinstance(value, dict): return {key: encode(item) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)): return [encode(item) for item in value]
+    elif isinstance(value, (np.integer, np.floating)): return value.item()
+    elif value == None or isinstance(value, (bool, int, float, str)): return value
+    raise ValueError(f'cannot checkpoint {value}')
+
+def decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'decimal' in value: return Decimal(value['decimal'])
+        elif 'vector' in value: return Vector(*[decode(scalar) for scalar in value['vector']])
+        return {key: decode(item) for key, item in value.items()}
+    elif isinstance(value, list): return [decode(item) for item in value]
+    return value
+
+def tensor(value: Any) -> Any:
+    if isinstance(value, dict) and 'vector' in value: return Vector.decimalize(Vector(*[decimalize(scalar) for scalar in value['vector']]))
+    return decimalize(value['decimal'] if isinstance(value, dict) else value)
+
+#integrator attributes, arrays kept apart under a prefix, nested steppers recursively
+def save_integrator(integrator: Integrator, arrays: dict[str, np.ndarray], prefix: str = 'integrator') -> dict:
+    if integrator.NAME not in STEPPERS: raise ValueError(f'cannot checkpoint integrator {integrator}')
+    attributes, nested = {}, {}
+    for key, value in vars(integrator).items():
+        if isinstance(value, Integrator): nested[key] = save_integrator(value, arrays, f'{prefix}.{key}')
+        elif isinstance(value, np.ndarray): arrays[f'{prefix}.{key}'] = value
+        else: attributes[key] = encode(value)
+    return {'name': integrator.NAME, 'attributes': attributes, 'nested': nested, 'prefix': prefix}
+
+def load_integrator(state: dict, arrays: Any) -> Integrator:
+    integrator = STEPPERS[state['name']].__new__(STEPPERS[state['name']])
+    for key, value in state['attributes'].items(): setattr(integrator, key, decode(value))
+    for key, value in state['nested'].items(): setattr(integrator, key, load_integrator(value, arrays))
+    prefix = f'{state["prefix"]}.'
+    for key in arrays.files:
+        if key.startswith(prefix) and '.' not in key[len(prefix):]: setattr(integrator, key[len(prefix):], arrays[key])
+    return integrator
+
+def scalars(values: list, decimal: bool) -> np.ndarray:
+    if decimal: return np.array([str(value) for value in values], dtype = 'S')
+    return np.array(values, dtype = float)
+
+def save_field(field: Field) -> dict:
+    formula = field.formula
+    kernel = field.kernel
+    return {
+        'id': field.id,
+        'name': field.name,
+        'units': field.units,
+        'formula': formula_name(formula) if formula != None else None,
+        #None kernel follows the formula's own
+        'kernel': None if kernel is getattr(formula, 'kernel', None) else reference(kernel, KERNELS),
+        'solver': reference(field.solver, SOLVERS) if field.solver != None else None,
+        'cutoff': encode(field.cutoff),
+        'skin': encode(field.skin)
+    }
+
+def save_ensemble(ensemble: Ensemble) -> dict:
+    return {
+        'id': ensemble.id,
+        'name': ensemble.name,
+        'forces': [
+            {'id': force.id, 'magnitude': encode(force.magnitude), 'center': encode(force.center)}
+            for force in ensemble.forces
+        ],
+        'rest_energy': encode(ensemble.rest_energy)
+    }
+
+def save(engine: Engine, path: Union[str, PathLike]) -> None:
+    numeric = engine.numeric
+    decimal = numeric.NAME == 'decimal'
+    arrays: dict[str, np.ndarray] = {}
+    groups = []
+    #registered fields and ensembles first, then removed ones still held by particles or engine attributes
+    objects: dict[int, Union[Field, Ensemble]] = {}
+    for gid, attributes in engine.attributes.items():
+        group = {'id': gid, 'priority-level': attributes.get('priority-level')}
+        object = attributes.get(Object)
+        if isinstance(object, Field): group['kind'] = 'field'
+        elif isinstance(object, Ensemble): group['kind'] = 'ensemble'
+        if isinstance(object, (Field, Ensemble)): objects[id(object)] = object
+        groups.append(group)
+    #particles, in object order
+    particles: list[Particle] = [index_for_object(object) for object in engine.objects.values()]
+    references = {key: value for key, value in vars(engine).items() if isinstance(value, (Field, Ensemble))}
+    for object in [particle.ensemble for particle in particles if particle.ensemble != None] + list(references.values()):
+        objects.setdefault(id(object), object)
+    fields = [save_field(object) for object in objects.values() if isinstance(object, Field)]
+    ensembles = [save_ensemble(object) for object in objects.values() if isinstance(object, Ensemble)]
+    ensemble_index = {key: i for i, key in enumerate([key for key, object in objects.items() if isinstance(object, Ensemble)])}
+    #particles, in object order
+    ids = [particle.id for particle in particles]
+    index = {id: i for i, id in enumerate(ids)}
+    arrays['ids'] = np.array(ids, dtype = 'S')
+    arrays['ensemble'] = np.array([ensemble_index[id(particle.ensemble)] if particle.ensemble != None else -1 for particle in particles], dtype = np.int32)
+    memberships = {}
+    arrays['membership'] = np.array([memberships.setdefault(tuple(engine.objects[id]['gid']), len(memberships)) for id in ids], dtype = np.int32)
+    for gid, members in engine.groups.items(): arrays[f'group.{gid}'] = np.array([index[uid] for uid in members], dtype = np.int32)
+    store = engine.store
+    if store != None:
+        #rows as they are, so summation order (and so results) carry over bit for bit
+        arrays['row'] = np.array([store.rows[id] for id in ids], dtype = np.int64)
+        arrays['position'] = store.positions().copy()
+        arrays['velocity'] = store.velocities().copy()
+        arrays['acceleration'] = store.accelerations().copy()
+        for gid in store.member:
+            arrays[f'magnitude.{gid}'] = store.magnitude[gid][:store.size].copy()
+            arrays[f'center.{gid}'] = store.center[gid][:store.size].copy()
+            arrays[f'member.{gid}'] = store.member[gid][:store.size].copy()
+    else:
+        #ragged Vectors flattened, with per particle lengths: position, degree count, then each degree
+        shape, values = [], []
+        for particle in particles:
+            degrees = [degree if isinstance(degree, Vector) else Vector() for degree in particle.kinematics.degrees]
+            shape.extend((len(particle.position), len(degrees), *[len(degree) for degree in degrees]))
+            values.extend(particle.position.vector)
+            for degree in degrees: values.extend(degree.vector)
+        arrays['shape'] = np.array(shape, dtype = np.int32)
+        arrays['scalars'] = scalars(values, decimal)
+    header = {
+        'format': FORMAT,
+        'version': VERSION,
+        'engine': {'module': type(engine).__module__, 'name': type(engine).__qualname__},
+        'numeric': numeric.NAME,
+        'precision': getattr(numeric, 'precision', None),
+        'store': store != None,
+        'dimensionality': store.dimensionality if store != None else None,
+        'workers': engine.pool.workers if engine.pool != None else None,
+        'random_ids': engine.random_ids,
+        'time': encode(engine.time),
+        'integrator': save_integrator(engine.integrator, arrays),
+        'fields': fields,
+        'ensembles': ensembles,
+        'groups': groups,
+        'memberships': [list(membership) for membership in memberships],
+        #instance attributes holding fields or ensembles, e.g. SubatomicEngine.proton_ensemble
+        'references': {key: value.id for key, value in references.items()}
+    }
+    arrays['header'] = np.frombuffer(json.dumps(header).encode('UTF-8'), dtype = np.uint8)
+    with open(path, 'wb') as handle: np.savez(handle, **arrays)
+
+def load(path: Union[str, PathLike]) -> Engine:
+    with np.load(path, allow_pickle = False) as arrays:
+        header = json.loads(arrays['header'].tobytes().decode('UTF-8'))
+        if header.get('format') != FORMAT: raise ValueError(f'{path} is not an engine checkpoint')
+        if header['version'] > VERSION: raise ValueError(f'checkpoint version {header["version"]} is newer than {VERSION}')
+        cls = getattr(import_module(header['engine']['module']), header['engine']['name'])
+        if not (isinstance(cls, type) and issubclass(cls, Engine)): raise ValueError(f'{cls} is not an Engine')
+        #bare Engine initialisation, subclasses' own setup (e.g. default fields) is replaced by the checkpoint's
+        engine = cls.__new__(cls)
+        Engine.__init__(
+            engine,
+            header['precision'] if header['precision'] != None else 50,
+            header['store'],
+            header['dimensionality'] if header['dimensionality'] != None else 3,
+            header['numeric'],
+            load_integrator(header['integrator'], arrays),
+            header['workers'],
+            header.get('random_ids', False)
+        )
+        with engine.numeric:
+            engine.time = tensor(header['time'])
+            objects: dict[str, Any] = {}
+            for field in header['fields']:
+                formula = FORMULAS[field['formula']] if field['formula'] != None else None
+                kernel = dereference(field['kernel'], KERNELS) if field['kernel'] != None else None
+                solver = dereference(field['solver'], SOLVERS) if field['solver'] != None else None
+                objects[field['id']] = Field(field['id'], field['name'], formula, field['units'], kernel, solver, decode(field['cutoff']), decode(field['skin']))
+            for ensemble in header['ensembles']:
+                forces = [Force(force['id'], tensor(force['magnitude']), tensor(force['center'])) for force in ensemble['forces']]
+                objects[ensemble['id']] = Ensemble(ensemble['id'], ensemble['name'], forces, tensor(ensemble['rest_energy']))
+            for group in header['groups']:
+                gid = group['id']
+                #touched first, so group order carries over even for cleared groups
+                engine.attributes[gid]
+                if group['priority-level'] != None: engine.attributes[gid]['priority-level'] = group['priority-level']
+                if gid in objects: engine.add_attribute(gid, objects[gid])
+            ensembles = [objects[ensemble['id']] for ensemble in header['ensembles']]
+            ids = arrays['ids'].astype('U').tolist()
+            particle_ensembles = [ensembles[i] if i >= 0 else None for i in arrays['ensemble'].tolist()]
+            if engine.store != None: particles = restore_store(engine, arrays, ids, particle_ensembles)
+            else: particles = restore_particles(engine, arrays, ids, particle_ensembles)
+        memberships = header['memberships']
+        for id, particle, membership in zip(ids, particles, arrays['membership'].tolist()):
+            engine.add_property(id, particle)
+            engine.objects[id]['gid'] = list(memberships[membership])
+        engine.groups = defaultdict(dict)
+        for key in arrays.files:
+            if key.startswith('group.'): engine.groups[key[len('group.'):]] = dict.fromkeys([ids[i] for i in arrays[key].tolist()])
+        for key, gid in header['references'].items(): setattr(engine, key, objects[gid])
+        #priority levels, names and the id counter of what was restored
+        engine.__reindex__()
+    return engine
+
+def restore_store(engine: Engine, arrays: Any, ids: list[str], ensembles: list[Ensemble]) -> list[Particle]:
+    from engine.store import ParticleView
+    store = engine.store
+    n = len(ids)
+    store.__grow__(n)
+    store.size = n
+    store.position[:n] = arrays['position']
+    store.velocity[:n] = arrays['velocity']
+    store.acceleration[:n] = arrays['acceleration']
+    for key in arrays.files:
+        if not key.startswith('member.'): continue
+        gid = key[len('member.'):]
+        store.__column__(gid)
+        store.magnitude[gid][:n] = arrays[f'magnitude.{gid}']
+        store.center[gid][:n] = arrays[f'center.{gid}']
+        store.member[gid][:n] = arrays[key]
+    rows = arrays['row'].tolist()
+    particles = [ParticleView(store, id, row, ensemble) for id, row, ensemble in zip(ids, rows, ensembles)]
+    store.ids = [None] * n
+    store.views = [None] * n
+    for particle in particles:
+        store.ids[particle.row] = particle.id
+        store.views[particle.row] = particle
+        store.rows[particle.id] = particle.row
+    store.changes += 1
+    return particles
+
+def restore_particles(engine: Engine, arrays: Any, ids: list[str], ensembles: list[Ensemble]) -> list[Particle]:
+    shape = arrays['shape'].tolist()
+    values = arrays['scalars']
+    if values.dtype.kind == 'S': values = [Decimal(value) for value in values.astype('U').tolist()]
+    else: values = values.tolist()
+    values = [decimalize(value) for value in values]
+    particles = []
+    i = j = 0
+    for id, ensemble in zip(ids, ensembles):
+        length, count = shape[i], shape[i + 1]
+        lengths = shape[i + 2:i + 2 + count]
+        i += 2 + count
+        position = Vector(*values[j:j + length])
+        j += length
+        degrees = []
+        for length in lengths:
+            degrees.append(Vector(*values[j:j + length]))
+            j += length
+        kinematics = Kinematics(*degrees) if len(degrees) > 0 else Kinematics()
+        if len(degrees) == 0: kinematics.degrees = []
+        particles.append(Particle(id, position, kinematics, ensemble))
+    return particles
@@ -0,0 +1,54 @@
+from __future__ import annotations
+from typing import Optional, Any
+import numpy as np
+from engine.util.typing import Number, Array
+
+#initial (n, d) position and velocity arrays, e.g. for Engine.add_particles
+#seed is anything numpy.random.default_rng takes (None, an int, a Generator)
+BOLTZMANN_CONSTANT = 1.380649e-23
+
+def offset(array: np.ndarray, center: Optional[Array]) -> np.ndarray:
+    if center is not None: array += np.asarray(center, dtype = float)
+    return array
+
+#the first n points of a (hyper)cubic lattice of spacing, centered on center (the origin)
+def lattice(
+        n: int,
+        spacing: Number,
+        dimensionality: int = 3,
+        center: Optional[Array] = None
+    ) -> np.ndarray:
+    side = max(int(round(n ** (1 / dimensionality))), 1)
+    while side ** dimensionality < n: side += 1
+    points = np.indices((side,) * dimensionality).reshape(dimensionality, -1).T[:n].astype(float)
+    return offset((points - (side - 1) / 2) * float(spacing), center)
+
+#n points uniformly within a (hyper)sphere of radius
+def uniform_sphere(
+        n: int,
+        radius: Number,
+        dimensionality: int = 3,
+        center: Optional[Array] = None,
+        seed: Any = None
+    ) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    direction = rng.normal(size = (n, dimensionality))
+    norm = np.linalg.norm(direction, axis = 1)
+    norm[norm == 0] = 1
+    radii = float(radius) * rng.random(n) ** (1 / dimensionality)
+    return offset(direction * (radii / norm)[:, None], center)
+
+#Maxwell-Boltzmann velocities at temperature (K) for particles of mass (kg), without net drift unless stationary is False
+def thermal(
+        n: int,
+        temperature: Number,
+        mass: Number,
+        dimensionality: int = 3,
+        seed: Any = None,
+        stationary: bool = True
+    ) -> np.ndarray:
+    if mass <= 0 or temperature < 0: raise ValueError
+    rng = np.random.default_rng(seed)
+    velocity = rng.normal(0, np.sqrt(BOLTZMANN_CONSTANT * float(temperature) / float(mass)), (n, dimensionality))
+    if stationary and n > 1: velocity -= velocity.mean(axis = 0)
+    return velocity
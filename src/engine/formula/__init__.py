@@ -1,7 +1,17 @@
 from engine import Vector, Particle, Field, Fields
-from engine.util.typing import Array
+from engine.util.typing import Array, decimalize
 from decimal import Decimal
+try: from engine.formula.kernel import Kernel, InverseSquareKernel
+except ImportError: Kernel = InverseSquareKernel = None
 
+#attaches a batched (array) kernel to a pairwise formula
+def batched(kernel: Kernel):
+    def decorator(formula):
+        formula.kernel = kernel
+        return formula
+    return decorator
+
+@batched(InverseSquareKernel() if InverseSquareKernel != None else None)
 def inverse_square(
         particle_1: Particle,
         particle_2: Particle,
@@ -16,9 +26,8 @@ def inverse_square(
     field_2 = particle_2.ensemble[field.id]
     if field_1 == None or field_2 == None: return Vector(0)
 
-    position_1 = particle_1.position + field_1.center
-    position_2 = particle_2.position + field_2.center
-    delta_position = position_2 - position_1
+    #centers are differenced apart from positions, as in the kernels, so small separations survive the offsets in float64
+    delta_position = (particle_2.position - particle_1.position) + (field_2.center - field_1.center)
     divisor = delta_position.magnitude() ** 2
     force = ((field_1.magnitude * field_2.magnitude) / divisor) if divisor != 0 else 0 
     force_vector = delta_position.magnitude_mapping(force)
@@ -26,20 +35,35 @@ def inverse_square(
 
 #G
 GRAVITATIONAL_CONSTANT = Decimal('6.674e-11')
+gravity_kernel = InverseSquareKernel(GRAVITATIONAL_CONSTANT) if InverseSquareKernel != None else None
+@batched(gravity_kernel)
 def gravity(
         particle_1: Particle,
         particle_2: Particle,
         field: Fields
     ) -> Vector:
-    force_vector = inverse_square(particle_1, particle_2, field) * GRAVITATIONAL_CONSTANT
+    force_vector = inverse_square(particle_1, particle_2, field) * decimalize(GRAVITATIONAL_CONSTANT)
     return force_vector
 
 #k_e
 COLOUMBS_CONSTANT = Decimal('8.988e9')
+electrostatic_kernel = InverseSquareKernel(COLOUMBS_CONSTANT) if InverseSquareKernel != None else None
+@batched(electrostatic_kernel)
 def electrostatic(
         particle_1: Particle,
         particle_2: Particle,
         field: Fields
     ) -> Vector:
-    force_vector = inverse_square(particle_1, particle_2, field) * COLOUMBS_CONSTANT
-    return force_vector
\ No newline at end of file
+    force_vector = inverse_square(particle_1, particle_2, field) * decimalize(COLOUMBS_CONSTANT)
+    return force_vector
+#name -> formula, so fields can reference their formula outside the process (e.g. checkpoints)
+FORMULAS = {formula.__name__: formula for formula in (inverse_square, gravity, electrostatic)}
+
+def register(formula, name: str = None):
+    FORMULAS[name if name != None else formula.__name__] = formula
+    return formula
+
+def formula_name(formula) -> str:
+    for name, registered in FORMULAS.items():
+        if registered is formula: return name
+    raise ValueError(f'{formula} is not a registered formula, see engine.formula.register')
@@ -0,0 +1,175 @@
+import numpy as np
+from math import sqrt
+from engine.util.typing import Number
+from engine.util.jit import JIT, jit
+
+#rows per tile, bounding each call to TILE x N pair temporaries
+TILE = 1024
+
+class Kernel:
+    def __call__(
+            self,
+            position_1: np.ndarray,
+            magnitude_1: np.ndarray,
+            position_2: np.ndarray,
+            magnitude_2: np.ndarray,
+            center_1: np.ndarray = None,
+            center_2: np.ndarray = None
+        ) -> np.ndarray:
+        raise NotImplementedError
+
+    #force on each row of 1 due to the matching row of 2, e.g. over neighbour pairs
+    def pair(
+            self,
+            position_1: np.ndarray,
+            magnitude_1: np.ndarray,
+            position_2: np.ndarray,
+            magnitude_2: np.ndarray,
+            center_1: np.ndarray = None,
+            center_2: np.ndarray = None
+        ) -> np.ndarray:
+        raise NotImplementedError
+
+    def pairwise(
+            self,
+            position: np.ndarray,
+            magnitude: np.ndarray,
+            center: np.ndarray = None,
+            tile: int = TILE,
+            targets: np.ndarray = None
+        ) -> np.ndarray:
+        #forces on targets (default every row) due to every row
+        targets = np.arange(len(position)) if targets is None else targets
+        output = np.zeros((len(targets), position.shape[1]))
+        for start in range(0, len(targets), tile):
+            stop = start + tile
+            rows = targets[start:stop]
+            output[start:stop] = self(
+                position[rows],
+                magnitude[rows],
+                position,
+                magnitude,
+                center[rows] if center is not None else None,
+                center
+            )
+        return output
+
+#separations from each row of 1 to every row of 2, (n, m, d)
+def separation(
+        position_1: np.ndarray,
+        position_2: np.ndarray,
+        center_1: np.ndarray = None,
+        center_2: np.ndarray = None
+    ) -> np.ndarray:
+    delta_position = position_2[np.newaxis, :, :] - position_1[:, np.newaxis, :]
+    #centers are differenced apart from positions so small separations survive large offsets
+    if center_1 is not None and center_2 is not None:
+        delta_position += center_2[np.newaxis, :, :] - center_1[:, np.newaxis, :]
+    return delta_position
+
+#every pair once, each force applied to both particles with Newton's third law
+@jit
+def inverse_square_pairwise(
+        position: np.ndarray,
+        magnitude: np.ndarray,
+        center: np.ndarray,
+        constant: float,
+        output: np.ndarray
+    ) -> None:
+    n, dimensionality = position.shape
+    delta_position = np.empty(dimensionality)
+    for i in range(n):
+        for j in range(i + 1, n):
+            divisor = 0.0
+            for k in range(dimensionality):
+                delta_position[k] = (position[j, k] - position[i, k]) + (center[j, k] - center[i, k])
+                divisor += delta_position[k] * delta_position[k]
+            if divisor == 0: continue
+            scale = constant * magnitude[i] * magnitude[j] / (divisor * sqrt(divisor))
+            for k in range(dimensionality):
+                output[i, k] += scale * delta_position[k]
+                output[j, k] -= scale * delta_position[k]
+
+@jit
+def inverse_square_targets(
+        position: np.ndarray,
+        magnitude: np.ndarray,
+        center: np.ndarray,
+        targets: np.ndarray,
+        constant: float,
+        output: np.ndarray
+    ) -> None:
+    n, dimensionality = position.shape
+    for t in range(len(targets)):
+        i = targets[t]
+        for j in range(n):
+            divisor = 0.0
+            for k in range(dimensionality):
+                d = (position[j, k] - position[i, k]) + (center[j, k] - center[i, k])
+                divisor += d * d
+            if divisor == 0: continue
+            scale = constant * magnitude[i] * magnitude[j] / (divisor * sqrt(divisor))
+            for k in range(dimensionality):
+                output[t, k] += scale * ((position[j, k] - position[i, k]) + (center[j, k] - center[i, k]))
+
+class InverseSquareKernel(Kernel):
+    def __init__(self, constant: Number = 1, jit: bool = True) -> None:
+        self.constant = float(constant)
+        #numba-compiled loops when available, NumPy tiles otherwise
+        self.jit = jit
+
+    def pairwise(
+            self,
+            position: np.ndarray,
+            magnitude: np.ndarray,
+            center: np.ndarray = None,
+            tile: int = TILE,
+            targets: np.ndarray = None
+        ) -> np.ndarray:
+        if not (JIT and self.jit): return super().pairwise(position, magnitude, center, tile, targets)
+        position = np.ascontiguousarray(position, dtype = float)
+        magnitude = np.ascontiguousarray(magnitude, dtype = float)
+        center = np.zeros_like(position) if center is None else np.ascontiguousarray(center, dtype = float)
+        if targets is None:
+            output = np.zeros_like(position)
+            inverse_square_pairwise(position, magnitude, center, self.constant, output)
+        else:
+            targets = np.ascontiguousarray(targets, dtype = np.int64)
+            output = np.zeros((len(targets), position.shape[1]))
+            inverse_square_targets(position, magnitude, center, targets, self.constant, output)
+        return output
+
+    def __call__(
+            self,
+            position_1: np.ndarray,
+            magnitude_1: np.ndarray,
+            position_2: np.ndarray,
+            magnitude_2: np.ndarray,
+            center_1: np.ndarray = None,
+            center_2: np.ndarray = None
+        ) -> np.ndarray:
+        delta_position = separation(position_1, position_2, center_1, center_2)
+        divisor = np.einsum('ijk,ijk->ij', delta_position, delta_position)
+        #coincident pairs (including self-pairs) exert no force, as in inverse_square
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            scale = magnitude_2[np.newaxis, :] / (divisor * np.sqrt(divisor))
+        scale[divisor == 0] = 0
+        forces = np.einsum('ij,ijk->ik', scale, delta_position)
+        return forces * (magnitude_1[:, np.newaxis] * self.constant)
+
+    def pair(
+            self,
+            position_1: np.ndarray,
+            magnitude_1: np.ndarray,
+            position_2: np.ndarray,
+            magnitude_2: np.ndarray,
+            center_1: np.ndarray = None,
+            center_2: np.ndarray = None
+        ) -> np.ndarray:
+        delta_position = position_2 - position_1
+        if center_1 is not None and center_2 is not None: delta_position += center_2 - center_1
+        divisor = np.einsum('ij,ij->i', delta_position, delta_position)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            scale = (magnitude_1 * magnitude_2) / (divisor * np.sqrt(divisor))
+        scale[divisor == 0] = 0
+        return delta_position * (scale[:, np.newaxis] * self.constant)
@@ -0,0 +1,319 @@
+from __future__ import annotations
+from typing import Union, Any
+from functools import reduce
+from math import factorial as fact, inf, sqrt
+from engine import Vector, Kinematics, Particle, Engine, index_for_object
+from engine.util.typing import Number, decimalize
+from engine.util.jit import JIT, jit
+
+Tensor = Any
+
+#particle state as stacked Vectors (a Vector of per-particle Vectors), in the engine's numeric backend
+class ParticleState:
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.particles: list[Particle] = [index_for_object(object) for object in engine.objects.values()]
+
+    def scalar(self, n: Number) -> Number:
+        return decimalize(n)
+
+    def series(self, tensor: Tensor, i: int, t: Number) -> Tensor:
+        return Kinematics.SERIES_FORMULA(tensor, i, t)
+
+    def __degree__(self, particle: Particle, degree: int) -> Vector:
+        degrees = particle.kinematics.degrees
+        return degrees[degree - 1] if len(degrees) >= degree and isinstance(degrees[degree - 1], Vector) else Vector()
+
+    def position(self) -> Tensor:
+        return Vector(*[particle.position for particle in self.particles])
+
+    def set_position(self, position: Tensor) -> None:
+        for particle, vector in zip(self.particles, position): particle.position = vector
+
+    def degrees(self) -> list[Tensor]:
+        n = max([len(particle.kinematics.degrees) for particle in self.particles], default = 0)
+        return [Vector(*[self.__degree__(particle, degree) for particle in self.particles]) for degree in range(1, n + 1)]
+
+    def velocity(self) -> Tensor:
+        return Vector(*[self.__degree__(particle, 1) for particle in self.particles])
+
+    def set_velocity(self, velocity: Tensor) -> None:
+        for particle, vector in zip(self.particles, velocity): particle.kinematics.set_motion(vector, degree = 1)
+
+    def acceleration(self) -> Tensor:
+        return Vector(*[self.__degree__(particle, 2) for particle in self.particles])
+
+    def reset_acceleration(self) -> None:
+        for particle in self.particles: particle.kinematics.set_motion(Vector(), degree = 2)
+
+    #adds field accelerations at the current positions
+    def accelerate(self, targets: Any = None) -> None:
+        self.engine.__accelerate__(targets)
+
+    #per-particle magnitudes, as floats
+    def norms(self, tensor: Tensor) -> list[float]:
+        return [float(vector.magnitude()) if len(vector) > 0 else 0.0 for vector in tensor]
+
+    def __len__(self) -> int:
+        return len(self.particles)
+
+#fused second-order Taylor update, x += v t + a t^2 / 2, v += a t, a = 0
+@jit
+def advance(
+        position: np.ndarray,
+        velocity: np.ndarray,
+        acceleration: np.ndarray,
+        t: float
+    ) -> None:
+    n, dimensionality = position.shape
+    for i in range(n):
+        for k in range(dimensionality):
+            position[i, k] += velocity[i, k] * t + acceleration[i, k] * (t * t / 2)
+            velocity[i, k] += acceleration[i, k] * t
+            acceleration[i, k] = 0.0
+
+#particle state as the float64 arrays of an engine.store.ParticleStore
+class StoreState(ParticleState):
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.store = engine.store
+
+    def scalar(self, n: Number) -> float:
+        return float(n)
+
+    def series(self, tensor: Tensor, i: int, t: Number) -> Tensor:
+        return tensor * (float(t ** i) * (1 / fact(i)))
+
+    def position(self) -> Tensor:
+        return self.store.positions().copy()
+
+    def set_position(self, position: Tensor) -> None:
+        self.store.positions()[:] = position
+
+    def degrees(self) -> list[Tensor]:
+        return [self.velocity(), self.acceleration()]
+
+    def velocity(self) -> Tensor:
+        return self.store.velocities().copy()
+
+    def set_velocity(self, velocity: Tensor) -> None:
+        self.store.velocities()[:] = velocity
+
+    def acceleration(self) -> Tensor:
+        return self.store.accelerations().copy()
+
+    def reset_acceleration(self) -> None:
+        self.store.accelerations()[:] = 0
+
+    def norms(self, tensor: Tensor) -> Tensor:
+        import numpy as np
+        return np.linalg.norm(tensor, axis = 1)
+
+    def advance(self, t: Number) -> None:
+        store = self.store
+        advance(store.positions(), store.velocities(), store.accelerations(), float(t))
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+def state(engine: Engine) -> ParticleState:
+    return StoreState(engine) if engine.store != None else ParticleState(engine)
+
+def total(tensors: list[Tensor]) -> Tensor:
+    return reduce(lambda f, g: f + g, tensors)
+
+class Integrator:
+    NAME = None
+
+    def step(self, state: ParticleState, t: Number) -> None:
+        raise NotImplementedError
+
+    #drops anything carried between steps, e.g. after particles are added or removed
+    def reset(self) -> None:
+        pass
+
+    #fresh accelerations at the state's current positions
+    def evaluate(self, state: ParticleState) -> Tensor:
+        state.reset_acceleration()
+        state.accelerate()
+        return state.acceleration()
+
+#Taylor series over every kinematic degree, accelerations accumulate onto any set ones and clear after the step
+class Taylor(Integrator):
+    NAME = 'taylor'
+
+    def step(self, state: ParticleState, t: Number) -> None:
+        state.accelerate()
+        if JIT and isinstance(state, StoreState): return state.advance(t)
+        position, degrees = state.position(), state.degrees()
+        state.set_position(total([state.series(degree, i, t) for i, degree in enumerate((position, *degrees))]))
+        state.set_velocity(total([state.series(degree, i, t) for i, degree in enumerate(degrees)]))
+        state.reset_acceleration()
+
+#kick-drift-kick, the end-of-step acceleration is reused as the next step's first kick
+class VelocityVerlet(Integrator):
+    NAME = 'verlet'
+
+    def __init__(self) -> None:
+        self.primed = False
+
+    def reset(self) -> None:
+        self.primed = False
+
+    def step(self, state: ParticleState, t: Number) -> None:
+        acceleration = state.acceleration() if self.primed else self.evaluate(state)
+        half = state.scalar(t / 2)
+        velocity = state.velocity() + acceleration * half
+        state.set_position(state.position() + velocity * state.scalar(t))
+        acceleration = self.evaluate(state)
+        state.set_velocity(velocity + acceleration * half)
+        self.primed = True
+
+#drift-kick-drift, one force evaluation at the half step
+class Leapfrog(Integrator):
+    NAME = 'leapfrog'
+
+    def step(self, state: ParticleState, t: Number) -> None:
+        half = state.scalar(t / 2)
+        state.set_position(state.position() + state.velocity() * half)
+        acceleration = self.evaluate(state)
+        velocity = state.velocity() + acceleration * state.scalar(t)
+        state.set_velocity(velocity)
+        state.set_position(state.position() + velocity * half)
+
+#classical fourth-order Runge-Kutta on (position, velocity), four force evaluations per step
+class RK4(Integrator):
+    NAME = 'rk4'
+
+    def step(self, state: ParticleState, t: Number) -> None:
+        h, half, sixth = state.scalar(t), state.scalar(t / 2), state.scalar(t / 6)
+        position, velocity = state.position(), state.velocity()
+        def derivative(x: Tensor, v: Tensor) -> tuple[Tensor, Tensor]:
+            state.set_position(x)
+            return v, self.evaluate(state)
+        k1 = derivative(position, velocity)
+        k2 = derivative(position + k1[0] * half, velocity + k1[1] * half)
+        k3 = derivative(position + k2[0] * half, velocity + k2[1] * half)
+        k4 = derivative(position + k3[0] * h, velocity + k3[1] * h)
+        two = state.scalar(2)
+        state.set_position(position + (k1[0] + k2[0] * two + k3[0] * two + k4[0]) * sixth)
+        state.set_velocity(velocity + (k1[1] + k2[1] * two + k3[1] * two + k4[1]) * sixth)
+
+#acceleration criterion, dt = sqrt(2 eta length / |a|) (as in GADGET), length being the smallest scale to resolve
+def timestep(acceleration: float, eta: float, length: float) -> float:
+    if acceleration == 0: return inf
+    return sqrt(2 * eta * length / acceleration)
+
+#substeps a stepper so that each substep satisfies the acceleration criterion for every particle
+class Adaptive(Integrator):
+    NAME = 'adaptive'
+    MAX_SUBSTEPS = 2 ** 16
+
+    def __init__(
+            self,
+            length: Number,
+            eta: float = 0.025,
+            integrator: Union[str, Integrator] = 'verlet',
+            t_min: Number = None,
+            t_max: Number = None
+        ) -> None:
+        self.length = float(length)
+        self.eta = eta
+        self.integrator = integrator if isinstance(integrator, Integrator) else INTEGRATORS[integrator]()
+        #Taylor accumulates onto the accelerations the criterion evaluates
+        if isinstance(self.integrator, Taylor): raise ValueError('adaptive stepping needs a stepper that keeps accelerations')
+        self.t_min = t_min
+        self.t_max = t_max
+        self.primed = False
+        self.substeps = 0
+
+    def reset(self) -> None:
+        self.primed = False
+        self.integrator.reset()
+
+    def timestep(self, state: ParticleState) -> float:
+        acceleration = state.acceleration() if self.primed else self.evaluate(state)
+        self.primed = True
+        return timestep(max(state.norms(acceleration), default = 0), self.eta, self.length)
+
+    def step(self, state: ParticleState, t: Number) -> None:
+        remaining = state.scalar(t)
+        t_min = float(self.t_min) if self.t_min != None else float(t) / Adaptive.MAX_SUBSTEPS
+        t_max = float(self.t_max) if self.t_max != None else inf
+        while remaining > 0:
+            dt = max(min(self.timestep(state), t_max), t_min)
+            dt = remaining if dt >= remaining else state.scalar(dt)
+            self.integrator.step(state, dt)
+            remaining -= dt
+            self.substeps += 1
+
+#hierarchical (power-of-two) block timesteps: fast particles substep, the rest advance coarsely, kick-drift-kick
+class BlockTimestep(Integrator):
+    NAME = 'block'
+
+    def __init__(
+            self,
+            length: Number,
+            eta: float = 0.025,
+            levels: int = 16
+        ) -> None:
+        self.length = float(length)
+        self.eta = eta
+        self.levels = levels
+        self.primed = False
+        self.level: np.ndarray = None
+
+    def reset(self) -> None:
+        self.primed = False
+
+    #level k advances in steps of t / 2^k, the finest level the criterion asks for
+    def __level__(self, acceleration: np.ndarray, t: float) -> np.ndarray:
+        import numpy as np
+        with np.errstate(divide = 'ignore'):
+            dt = np.sqrt(2 * self.eta * self.length / acceleration)
+            level = np.ceil(np.log2(t / dt))
+        return np.clip(np.nan_to_num(level, neginf = 0, posinf = self.levels), 0, self.levels).astype(int)
+
+    def step(self, state: ParticleState, t: Number) -> None:
+        if not isinstance(state, StoreState): raise TypeError('block timesteps need the particle store')
+        import numpy as np
+        t = float(t)
+        if not self.primed: self.evaluate(state)
+        self.primed = True
+        store = state.store
+        position, velocity, acceleration = store.positions(), store.velocities(), store.accelerations()
+        #integer ticks of t / 2^levels
+        end = 1 << self.levels
+        tick = t / end
+        level = self.__level__(state.norms(acceleration), t)
+        span = end >> level
+        velocity += acceleration * (span * tick / 2)[:, np.newaxis]
+        upcoming = span.copy()
+        now = 0
+        while now < end:
+            following = int(upcoming.min())
+            position += velocity * ((following - now) * tick)
+            now = following
+            closing = np.flatnonzero(upcoming == now)
+            acceleration[closing] = 0
+            state.accelerate(closing)
+            velocity[closing] += acceleration[closing] * (span[closing] * tick / 2)[:, np.newaxis]
+            if now == end: break
+            #closing particles re-level, only as coarse as the current tick stays aligned to
+            closing_level = self.__level__(state.norms(acceleration[closing]), t)
+            closing_span = end >> closing_level
+            while True:
+                misaligned = now % closing_span != 0
+                if not misaligned.any(): break
+                closing_span[misaligned] >>= 1
+            level[closing] = self.levels - np.log2(closing_span).astype(int)
+            span[closing] = closing_span
+            velocity[closing] += acceleration[closing] * (closing_span * tick / 2)[:, np.newaxis]
+            upcoming[closing] = now + closing_span
+        self.level = level
+
+INTEGRATORS = {integrator.NAME: integrator for integrator in (Taylor, VelocityVerlet, Leapfrog, RK4)}
+
+def integrator(name: str) -> Integrator:
+    if name not in INTEGRATORS: raise ValueError(f'integrator must be one of {list(INTEGRATORS)}')
+    return INTEGRATORS[name]()
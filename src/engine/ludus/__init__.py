@@ -1,7 +1,8 @@
-from typing import Union
+from typing import Union, Optional
 from os import urandom
 from base58 import b58encode
 from collections import defaultdict 
+from itertools import count
 from json import dumps, loads
 from pickle import dump, load, HIGHEST_PROTOCOL
 from math import inf
@@ -24,11 +25,15 @@ class Ludus(Viewport):
     UID = 'u'
     GID = 'g'
 
-    def __init__(self, encoded: bool = True) -> None:
+    def __init__(self, encoded: bool = True, random_ids: bool = False) -> None:
         self.encoded = encoded
+        #prefix-counter ids (u-1, g-2, ...) by default, random base58 ids (e.g. unique across sessions) otherwise
+        self.random_ids = random_ids
+        #bumped on every change to objects, membership or attributes, for structures cached elsewhere
+        self.changes = 0
         self.objects = defaultdict(lambda: defaultdict(list))
-        self.__grouping__()
         self.attributes = defaultdict(lambda: defaultdict(dict))
+        self.__grouping__()
     
     def __dictionary__(self, obj: Union[dict, object]) -> dict:
         if type(obj) == dict: return obj
@@ -44,12 +49,24 @@ class Ludus(Viewport):
     def __id__(prefix: str, n: int = 16) -> str:
         id = b58encode(urandom(n)).decode('UTF-8')
         return f'{prefix}-{id}'
+
+    def __new_id__(self, prefix: str) -> str:
+        if self.random_ids: return Ludus.__id__(prefix)
+        return f'{prefix}-{next(self.handles)}'
+
+    #integer handle of a counter id, None for random ids
+    def handle(id: str) -> Optional[int]:
+        handle = id[id.rfind('-') + 1:]
+        return int(handle) if handle.isdigit() else None
     
     def new_object(self) -> str:
-        return Ludus.__id__(Ludus.UID)
+        return self.__new_id__(Ludus.UID)
+
+    def new_objects(self, n: int) -> list[str]:
+        return [self.__new_id__(Ludus.UID) for _ in range(n)]
 
     def new_group(self, priority_level: Union[int, float] =  Viewport.HIGHEST_PRIORITY_LEVEL) -> str:
-        gid = Ludus.__id__(Ludus.GID)
+        gid = self.__new_id__(Ludus.GID)
         self.add_attribute(gid, {'priority-level': priority_level})
         return gid
 
@@ -69,65 +86,186 @@ class Ludus(Viewport):
         return uid
 
     def remove_object(self, uid: str) -> None:
+        self.changes += 1
         gid = self.objects[uid]['gid']
         for group in gid:
-            self.groups[group].remove(uid)
+            del self.groups[group][uid]
             if len(self.groups[group]) == 0: del self.groups[group]
+        self.__unprioritise__(uid)
         del self.objects[uid]
+
+    def remove_objects(self, uids: list[str]) -> None:
+        for uid in uids: self.remove_object(uid)
         
     def add_property(self, uid: str, properties: Union[dict, object]) -> None:
+        self.changes += 1
         properties = self.__dictionary__(properties)
         self.objects[uid].update(properties)
 
     def remove_property(self, uid: str, properties: list) -> None:
+        self.changes += 1
         [self.objects[uid].pop(property, None) for property in properties]
 
     def clear_properties(self, uid: str) -> None:
+        self.changes += 1
         self.objects[uid].clear()
 
     def attach_group(self, uid: str, gid: Union[str, list], attributes: dict = {}, priority_level: Union[int, float] = Viewport.HIGHEST_PRIORITY_LEVEL) -> None:
+        self.changes += 1
         if type(gid) == str: gid = [gid]
         self.objects[uid]['gid'].extend(gid)
         for group in gid:
-            self.groups[group].append(uid)
-            self.attributes[group].update(attributes)
+            self.groups[group][uid] = None
+            self.add_attribute(group, attributes)
+            if self.attributes[group]['priority-level'] != {}: continue
+            self.add_attribute(group, {'priority-level': priority_level})
+        self.__prioritise__(uid)
+    
+    #attach_group for many objects at once, all joining every group in gid
+    def attach_groups(self, uids: list[str], gid: Union[str, list], attributes: dict = {}, priority_level: Union[int, float] = Viewport.HIGHEST_PRIORITY_LEVEL) -> None:
+        self.changes += 1
+        if type(gid) == str: gid = [gid]
+        for uid in uids: self.objects[uid]['gid'].extend(gid)
+        for group in gid:
+            self.groups[group].update(dict.fromkeys(uids))
+            self.add_attribute(group, attributes)
             if self.attributes[group]['priority-level'] != {}: continue
-            self.attributes[group]['priority-level'] = priority_level
+            self.add_attribute(group, {'priority-level': priority_level})
+        self.__prioritise_all__(uids)
     
     def detach_group(self, uid: str, gid: list) -> None:
+        self.changes += 1
         if type(gid) == str: gid = [gid]
         groups = self.objects[uid]['gid']
         groups = [group for group in groups if group not in gid]
         self.objects[uid]['gid'] = groups
         for group in gid:
-            self.groups[group].remove(uid)
+            del self.groups[group][uid]
             if len(self.groups[group]) == 0:
                 del self.groups[group]
+                self.__unname_group__(group)
                 del self.attributes[group]
+        self.__prioritise__(uid)
     
     def add_attribute(self, gid: str, attributes: Union[dict, object]) -> None:
+        self.changes += 1
         attributes = self.__dictionary__(attributes)
+        if len(attributes) == 0: return None
+        self.__unname_group__(gid)
         self.attributes[gid].update(attributes)
+        self.__name_group__(gid)
+        if 'priority-level' in attributes:
+            for uid in self.groups.get(gid, ()): self.__prioritise__(uid)
     
     def remove_attribute(self, gid: str, attributes: list) -> None:
+        self.changes += 1
+        self.__unname_group__(gid)
         [self.attributes[gid].pop(attribute, None) for attribute in attributes]
+        self.__name_group__(gid)
 
     def clear_attributes(self, gid: str) -> None:
+        self.changes += 1
+        self.__unname_group__(gid)
         self.attributes[gid].clear()
+
+    #gids of groups named name, in creation order
+    #a name set directly on an attribute object (e.g. ensemble.name = ...) is only dropped from its old name here,
+    #rename (or add_attribute) indexes the new one
+    def named(self, name: str) -> list[str]:
+        gids = list(self.names.get(name, ()))
+        for gid in [gid for gid in gids if self.__group_name__(gid) != name]:
+            self.__unname_group__(gid)
+            self.__name_group__(gid)
+        return [gid for gid in gids if self.__group_name__(gid) == name]
+
+    def rename(self, gid: str, name: Optional[str]) -> None:
+        self.changes += 1
+        self.__unname_group__(gid)
+        attributes = self.attributes[gid]
+        if 'name' not in attributes and object in attributes: attributes[object].name = name
+        else: attributes['name'] = name
+        self.__name_group__(gid)
+
+    def __group_name__(self, gid: str) -> Optional[str]:
+        attributes = self.attributes.get(gid)
+        if attributes == None: return None
+        if 'name' in attributes: return attributes['name']
+        return getattr(attributes.get(object), 'name', None)
+
+    def __name_group__(self, gid: str) -> None:
+        name = self.__group_name__(gid)
+        if name == None: return None
+        self.names[name][gid] = None
+        self.indexed_names[gid] = name
+
+    #by the name the group was indexed under, which a direct rename may have changed since
+    def __unname_group__(self, gid: str) -> None:
+        name = self.indexed_names.pop(gid, None)
+        if name == None or name not in self.names: return None
+        self.names[name].pop(gid, None)
+        if len(self.names[name]) == 0: del self.names[name]
+
+    def __level__(self, gid: str) -> Union[int, float]:
+        level = self.attributes[gid]['priority-level']
+        return level if isinstance(level, (int, float)) else Viewport.LOWEST_PRIORITY_LEVEL
+
+    #moves uid to the bucket of its highest group priority level
+    def __prioritise__(self, uid: str) -> None:
+        level = max([self.__level__(gid) for gid in self.objects[uid]['gid']], default = Viewport.LOWEST_PRIORITY_LEVEL)
+        if self.priorities.get(uid) == level: return None
+        self.__unprioritise__(uid)
+        self.priorities[uid] = level
+        self.levels[level][uid] = None
+
+    #__prioritise__ for many objects, levels computed once per distinct set of groups
+    def __prioritise_all__(self, uids: list[str]) -> None:
+        levels = {}
+        for uid in uids:
+            gid = tuple(self.objects[uid]['gid'])
+            if gid not in levels: levels[gid] = max([self.__level__(group) for group in gid], default = Viewport.LOWEST_PRIORITY_LEVEL)
+            level = levels[gid]
+            if self.priorities.get(uid) == level: continue
+            self.__unprioritise__(uid)
+            self.priorities[uid] = level
+            self.levels[level][uid] = None
+
+    def __unprioritise__(self, uid: str) -> None:
+        level = self.priorities.pop(uid, None)
+        if level == None: return None
+        del self.levels[level][uid]
+        if len(self.levels[level]) == 0: del self.levels[level]
     
     def by(self, key: str) -> dict:
         objects = defaultdict(list)
-        items = sorted(self.objects.items(), key = lambda pair: max([self.attributes[group]['priority-level'] for group in pair[1]['gid']]))
-        for uid, values in items:
-            for value in values[key]: objects[tuple(value)] = uid
+        #lowest priority level first, so higher levels overwrite
+        for level in sorted(self.levels):
+            for uid in self.levels[level]:
+                for value in self.objects[uid][key]: objects[tuple(value)] = uid
         return objects
 
+    #membership (gid -> ordered set of uids) and priority levels from the objects' gids
     def __grouping__(self) -> None:
-        self.groups = defaultdict(list)
+        self.groups = defaultdict(dict)
         for uid, values in self.objects.items():
             groups = values['gid']
             for gid in groups:
-                self.groups[gid].append(uid)
+                self.groups[gid][uid] = None
+        self.__reindex__()
+
+    #priority buckets, the name index and the id counter from objects, groups and attributes as they are
+    def __reindex__(self) -> None:
+        self.changes += 1
+        #priority level -> uids (ordered set), and uid -> level
+        self.levels = defaultdict(dict)
+        self.priorities = {}
+        for uid in self.objects: self.__prioritise__(uid)
+        #name -> gids (ordered set), of groups whose attributes (or attribute object) have a name
+        self.names = defaultdict(dict)
+        #gid -> the name it is indexed under
+        self.indexed_names: dict[str, str] = {}
+        for gid in self.attributes: self.__name_group__(gid)
+        handles = [Ludus.handle(id) for id in (*self.objects, *self.attributes)]
+        self.handles = count(max([handle for handle in handles if handle != None], default = 0) + 1)
 
     def serialize(self, indent: int = 0) -> str:
         return dumps(self.objects, indent = indent)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from weakref import finalize
+from os import cpu_count
+import numpy as np
+from engine.formula.kernel import Kernel, TILE
+
+#shared block layout: position (n, d), magnitude (n), center (n, d), targets (m), output (m, d)
+def layout(n: int, m: int, dimensionality: int) -> dict[str, tuple[int, tuple, str]]:
+    offset = 0
+    arrays = {}
+    for key, shape, dtype in (
+            ('position', (n, dimensionality), 'f8'),
+            ('magnitude', (n,), 'f8'),
+            ('center', (n, dimensionality), 'f8'),
+            ('targets', (m,), 'i8'),
+            ('output', (m, dimensionality), 'f8')
+        ):
+        arrays[key] = (offset, shape, dtype)
+        offset += int(np.prod(shape)) * 8
+    return arrays
+
+def size(arrays: dict[str, tuple[int, tuple, str]]) -> int:
+    return max([offset + int(np.prod(shape)) * 8 for offset, shape, _ in arrays.values()], default = 0)
+
+def views(buffer, arrays: dict[str, tuple[int, tuple, str]]) -> dict[str, np.ndarray]:
+    return {key: np.ndarray(shape, dtype = dtype, buffer = buffer, offset = offset) for key, (offset, shape, dtype) in arrays.items()}
+
+#worker-side attachments, by shared block name
+ATTACHED: dict[str, shared_memory.SharedMemory] = {}
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    if name not in ATTACHED:
+        for block in ATTACHED.values(): block.close()
+        ATTACHED.clear()
+        ATTACHED[name] = shared_memory.SharedMemory(name = name)
+    return ATTACHED[name]
+
+def __tile__(
+        kernel: Kernel,
+        name: str,
+        arrays: dict[str, tuple[int, tuple, str]],
+        has_center: bool,
+        start: int,
+        stop: int
+    ) -> None:
+    shared = views(attach(name).buf, arrays)
+    center = shared['center'] if has_center else None
+    shared['output'][start:stop] = kernel.pairwise(
+        shared['position'],
+        shared['magnitude'],
+        center,
+        targets = shared['targets'][start:stop]
+    )
+    del shared, center
+
+#process pool evaluating kernel forces over target row blocks, positions shared through shared memory
+class ParallelPool:
+    #below this many targets a serial call beats the dispatch
+    THRESHOLD = 2 * TILE
+
+    def __init__(self, workers: int = None) -> None:
+        self.workers = workers if workers != None else cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers = self.workers)
+        self.block: shared_memory.SharedMemory = None
+        self.finalizer = finalize(self, ParallelPool.__release__, self.executor, [None])
+
+    @staticmethod
+    def __release__(executor: ProcessPoolExecutor, blocks: list) -> None:
+        executor.shutdown(wait = True)
+        for block in blocks:
+            if block == None: continue
+            block.close()
+            block.unlink()
+
+    def __allocate__(self, nbytes: int) -> shared_memory.SharedMemory:
+        if self.block == None or self.block.size < nbytes:
+            if self.block != None:
+                self.block.close()
+                self.block.unlink()
+            self.block = shared_memory.SharedMemory(create = True, size = max(nbytes, 1))
+            self.finalizer.detach()
+            self.finalizer = finalize(self, ParallelPool.__release__, self.executor, [self.block])
+        return self.block
+
+    def pairwise(
+            self,
+            kernel: Kernel,
+            position: np.ndarray,
+            magnitude: np.ndarray,
+            center: np.ndarray = None,
+            targets: np.ndarray = None
+        ) -> np.ndarray:
+        targets = np.arange(len(position)) if targets is None else np.asarray(targets)
+        if len(targets) < ParallelPool.THRESHOLD or self.workers < 2:
+            return kernel.pairwise(position, magnitude, center, targets = targets)
+        n, dimensionality = position.shape
+        arrays = layout(n, len(targets), dimensionality)
+        block = self.__allocate__(size(arrays))
+        shared = views(block.buf, arrays)
+        shared['position'][:] = position
+        shared['magnitude'][:] = magnitude
+        if center is not None: shared['center'][:] = center
+        shared['targets'][:] = targets
+        #fixed contiguous blocks per worker, so every row is always summed the same way
+        bounds = np.linspace(0, len(targets), self.workers + 1).astype(int)
+        futures = [
+            self.executor.submit(__tile__, kernel, block.name, arrays, center is not None, int(start), int(stop))
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ]
+        [future.result() for future in futures]
+        output = shared['output'].copy()
+        del shared
+        return output
+
+    def close(self) -> None:
+        self.finalizer()
+        self.block = None
@@ -0,0 +1,93 @@
+from __future__ import annotations
+from typing import Callable, Optional, Any
+from collections import defaultdict
+from time import perf_counter
+from sys import getallocatedblocks
+
+#per-phase timers, per-field pair counts and allocated block deltas, filled by Engine while profiling
+#phases:
+#   'step' the whole integrator step, 'kinematics' being step minus 'accelerate'
+#   'accelerate' force evaluation, 'lookup' resolving members, forces and magnitudes for each field
+#   'field:<name>' one field's pair evaluation and acceleration
+#   'apply' adding each particle's accumulated acceleration to its kinematics (object engines)
+#   'dumps', 'trajectory' serialization and trajectory frames
+#fixed phases come first, in this order
+PHASES = ['step', 'kinematics', 'accelerate', 'lookup']
+
+class Profile:
+    def __init__(
+            self,
+            every: Optional[int] = None,
+            report: Optional[Callable[[Profile], Any]] = None
+        ) -> None:
+        if every != None and every < 1: raise ValueError
+        #steps between reports, None never reports
+        self.every = every
+        self.report = report if report != None else print
+        self.reset()
+
+    def reset(self) -> None:
+        self.steps = 0
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+        #net change of allocated (small object) blocks
+        self.allocated: dict[str, int] = defaultdict(int)
+        #pairs considered, pairs approximated by a solver are not counted
+        self.pairs: dict[str, int] = defaultdict(int)
+
+    def field(field: Any) -> str:
+        return f'field:{field.name if field.name != None else field.id}'
+
+    def begin(self) -> tuple[float, int]:
+        return perf_counter(), getallocatedblocks()
+
+    def end(self, phase: str, begin: tuple[float, int]) -> None:
+        seconds, blocks = begin
+        self.seconds[phase] += perf_counter() - seconds
+        self.allocated[phase] += getallocatedblocks() - blocks
+        self.calls[phase] += 1
+
+    #ends phase and begins the next one
+    def lap(self, phase: str, begin: tuple[float, int]) -> tuple[float, int]:
+        self.end(phase, begin)
+        return self.begin()
+
+    def count(self, field: Any, pairs: int) -> None:
+        self.pairs[Profile.field(field)] += pairs
+
+    def tick(self) -> None:
+        self.steps += 1
+        if self.every != None and self.steps % self.every == 0: self.report(self)
+
+    def phases(self) -> dict[str, dict]:
+        phases = {}
+        names = [name for name in PHASES if name in self.seconds or (name == 'kinematics' and 'step' in self.seconds)]
+        names += sorted([name for name in self.seconds if name not in names])
+        for name in names:
+            if name == 'kinematics':
+                seconds = self.seconds['step'] - self.seconds.get('accelerate', 0.0)
+                calls, allocated = self.calls['step'], self.allocated['step'] - self.allocated.get('accelerate', 0)
+            else: seconds, calls, allocated = self.seconds[name], self.calls[name], self.allocated[name]
+            phases[name] = {
+                'seconds': seconds,
+                'calls': calls,
+                'mean': seconds / calls if calls > 0 else 0.0,
+                'allocated': allocated
+            }
+            if name in self.pairs:
+                phases[name]['pairs'] = self.pairs[name]
+                phases[name]['pairs/s'] = self.pairs[name] / seconds if seconds > 0 else 0.0
+        return phases
+
+    #JSON-friendly
+    def statistics(self) -> dict:
+        return {'steps': self.steps, 'phases': self.phases()}
+
+    def __repr__(self) -> str:
+        phases = self.phases()
+        width = max([len(name) for name in phases], default = 5)
+        lines = [f'{"phase":<{width}}{"total s":>12}{"calls":>10}{"mean µs":>12}{"blocks":>10}{"pairs":>14}']
+        for name, phase in phases.items():
+            pairs = phase.get('pairs', '')
+            lines.append(f'{name:<{width}}{phase["seconds"]:>12.4f}{phase["calls"]:>10}{phase["mean"] * 1e6:>12.1f}{phase["allocated"]:>10}{pairs:>14}')
+        return f'{self.steps} steps\n' + '\n'.join(lines)
@@ -0,0 +1,312 @@
+from __future__ import annotations
+from typing import Union
+from itertools import product
+from math import sqrt
+import numpy as np
+from engine import Vector, Field
+from engine.formula.kernel import InverseSquareKernel
+from engine.util.jit import JIT, jit
+
+#exact all-pairs evaluation through the field's kernel
+class Solver:
+    def solve(
+            self,
+            field: Field,
+            position: np.ndarray,
+            magnitude: np.ndarray,
+            center: np.ndarray = None
+        ) -> np.ndarray:
+        return field.kernel.pairwise(position, magnitude, center)
+
+#flat orthant tree, nodes in level order, each node's children and a leaf's particles being contiguous ranges
+class Tree:
+    def __init__(self, dimensionality: int) -> None:
+        self.lower = np.zeros((0, dimensionality))
+        self.size = np.zeros(0)
+        #|magnitude|-weighted center, from which the opening angle is measured
+        self.centroid = np.zeros((0, dimensionality))
+        #positive and negative monopoles, (nodes, 2, d) and (nodes, 2)
+        self.position = np.zeros((0, 2, dimensionality))
+        self.magnitude = np.zeros((0, 2))
+        #first child and number of children, leaves having none
+        self.first = np.zeros(0, dtype = np.int64)
+        self.children = np.zeros(0, dtype = np.int64)
+        #a leaf's particles are particles[start:start + count]
+        self.start = np.zeros(0, dtype = np.int64)
+        self.count = np.zeros(0, dtype = np.int64)
+        self.particles = np.zeros(0, dtype = np.int64)
+
+    def __len__(self) -> int:
+        return len(self.size)
+
+#depth-first walk of the flat tree for every target, stack being scratch of at least len(tree)
+@jit
+def barnes_hut(
+        position: np.ndarray,
+        magnitude: np.ndarray,
+        lower: np.ndarray,
+        size: np.ndarray,
+        centroid: np.ndarray,
+        node_position: np.ndarray,
+        node_magnitude: np.ndarray,
+        first: np.ndarray,
+        children: np.ndarray,
+        start: np.ndarray,
+        count: np.ndarray,
+        particles: np.ndarray,
+        theta: float,
+        constant: float,
+        stack: np.ndarray,
+        output: np.ndarray
+    ) -> None:
+    n, dimensionality = position.shape
+    for i in range(n):
+        stack[0] = 0
+        top = 1
+        while top > 0:
+            top -= 1
+            node = stack[top]
+            if children[node] == 0:
+                for s in range(start[node], start[node] + count[node]):
+                    j = particles[s]
+                    divisor = 0.0
+                    for k in range(dimensionality):
+                        d = position[j, k] - position[i, k]
+                        divisor += d * d
+                    if divisor == 0: continue
+                    scale = constant * magnitude[i] * magnitude[j] / (divisor * sqrt(divisor))
+                    for k in range(dimensionality):
+                        output[i, k] += scale * (position[j, k] - position[i, k])
+                continue
+            distance = 0.0
+            inside = True
+            for k in range(dimensionality):
+                d = position[i, k] - centroid[node, k]
+                distance += d * d
+                if position[i, k] < lower[node, k] or position[i, k] > lower[node, k] + size[node]: inside = False
+            if size[node] < theta * sqrt(distance) and not inside:
+                for sign in range(2):
+                    divisor = 0.0
+                    for k in range(dimensionality):
+                        d = node_position[node, sign, k] - position[i, k]
+                        divisor += d * d
+                    if divisor == 0: continue
+                    scale = constant * magnitude[i] * node_magnitude[node, sign] / (divisor * sqrt(divisor))
+                    for k in range(dimensionality):
+                        output[i, k] += scale * (node_position[node, sign, k] - position[i, k])
+                continue
+            for child in range(first[node], first[node] + children[node]):
+                stack[top] = child
+                top += 1
+
+#Barnes-Hut over an orthant tree (an octree in 3D), built level by level in array operations
+#each node keeps separate positive and negative monopoles, so with mixed signs the truncation error is
+#quadrupole order: small against the RMS force, large for particles whose net force nearly cancels (see README)
+class BarnesHut(Solver):
+    LEAF_SIZE = 8
+    MAX_DEPTH = 32
+
+    def __init__(self, theta: float = 0.5, leaf_size: int = LEAF_SIZE) -> None:
+        self.theta = theta
+        self.leaf_size = leaf_size
+
+    def build(self, position: np.ndarray, magnitude: np.ndarray) -> Tree:
+        n, dimensionality = position.shape
+        tree = Tree(dimensionality)
+        lower = position.min(axis = 0)
+        size = float((position.max(axis = 0) - lower).max())
+        bits = 1 << np.arange(dimensionality)
+        orthants = 1 << dimensionality
+        levels = []
+        #particles of the current level's nodes, their node (within the level) and each node's lower corner
+        active, node, corner = np.arange(n), np.zeros(n, dtype = np.int64), lower[np.newaxis, :]
+        offset, leaves = 0, 0
+        for depth in range(BarnesHut.MAX_DEPTH + 1):
+            nodes = len(corner)
+            p, m = position[active], magnitude[active]
+            count = np.bincount(node, minlength = nodes)
+            level = {'lower': corner, 'size': np.full(nodes, size), 'count': count}
+            #monopoles per sign, with empty signs placed at the centroid
+            weight = np.abs(m)
+            total = np.bincount(node, weight, minlength = nodes)
+            moment = np.stack([np.bincount(node, weight * p[:, k], minlength = nodes) for k in range(dimensionality)], axis = 1)
+            mean = np.stack([np.bincount(node, p[:, k], minlength = nodes) for k in range(dimensionality)], axis = 1) / count[:, np.newaxis]
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                level['centroid'] = np.where(total[:, np.newaxis] != 0, moment / total[:, np.newaxis], mean)
+            level['position'] = np.zeros((nodes, 2, dimensionality))
+            level['magnitude'] = np.zeros((nodes, 2))
+            for sign, signed in enumerate((m > 0, m < 0)):
+                charge = np.bincount(node, np.where(signed, m, 0), minlength = nodes)
+                moment = np.stack([np.bincount(node, np.where(signed, m * p[:, k], 0), minlength = nodes) for k in range(dimensionality)], axis = 1)
+                with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                    level['position'][:, sign] = np.where(charge[:, np.newaxis] != 0, moment / charge[:, np.newaxis], level['centroid'])
+                level['magnitude'][:, sign] = charge
+            leaf = (count <= self.leaf_size) | (depth >= BarnesHut.MAX_DEPTH) | (size == 0)
+            #leaf particles, grouped by node
+            in_leaf = leaf[node]
+            order = np.argsort(node[in_leaf], kind = 'stable')
+            level['particles'] = active[in_leaf][order]
+            level['start'] = np.zeros(nodes, dtype = np.int64)
+            level['start'][leaf] = leaves + np.cumsum(count[leaf]) - count[leaf]
+            leaves += len(level['particles'])
+            #particles of split nodes move into the child orthant they lie in
+            active, node = active[~in_leaf], node[~in_leaf]
+            half = size / 2
+            upper = position[active] >= corner[node] + half
+            key, node = np.unique(node * orthants + (upper * bits).sum(axis = 1), return_inverse = True)
+            node = node.reshape(-1)
+            parent = key // orthants
+            level['children'] = np.bincount(parent, minlength = nodes)
+            level['first'] = offset + nodes + np.searchsorted(parent, np.arange(nodes))
+            levels.append(level)
+            offset += nodes
+            if len(active) == 0: break
+            code = key % orthants
+            corner = corner[parent] + ((code[:, np.newaxis] & bits) != 0) * half
+            size = half
+        for name in ('lower', 'size', 'centroid', 'position', 'magnitude', 'first', 'children', 'start', 'count', 'particles'):
+            setattr(tree, name, np.concatenate([level[name] for level in levels]))
+        return tree
+
+    def solve(
+            self,
+            field: Field,
+            position: np.ndarray,
+            magnitude: np.ndarray,
+            center: np.ndarray = None
+        ) -> np.ndarray:
+        kernel = field.kernel
+        if not isinstance(kernel, InverseSquareKernel): raise TypeError('Barnes-Hut requires an inverse-square field kernel')
+        output = np.zeros_like(position, dtype = float)
+        if len(position) == 0: return output
+        #fold per-particle center offsets into positions, relative to a shared reference
+        if center is not None: position = position + (center - center[0])
+        tree = self.build(position, magnitude)
+        #numba-compiled walk per target when available, NumPy walk with targets batched per node otherwise
+        if JIT and kernel.jit:
+            position = np.ascontiguousarray(position, dtype = float)
+            barnes_hut(
+                position,
+                np.ascontiguousarray(magnitude, dtype = float),
+                tree.lower,
+                tree.size,
+                tree.centroid,
+                tree.position,
+                tree.magnitude,
+                tree.first,
+                tree.children,
+                tree.start,
+                tree.count,
+                tree.particles,
+                float(self.theta),
+                kernel.constant,
+                np.zeros(len(tree), dtype = np.int64),
+                output
+            )
+            return output
+        #targets batched per node
+        stack = [(0, np.arange(len(position)))]
+        while len(stack) > 0:
+            node, targets = stack.pop()
+            if tree.children[node] == 0:
+                index = tree.particles[tree.start[node]:tree.start[node] + tree.count[node]]
+                output[targets] += kernel(position[targets], magnitude[targets], position[index], magnitude[index])
+                continue
+            #opening angle criterion, targets inside a node's box always open it
+            p = position[targets]
+            distance = np.linalg.norm(p - tree.centroid[node], axis = 1)
+            inside = np.all((p >= tree.lower[node]) & (p <= tree.lower[node] + tree.size[node]), axis = 1)
+            accepted = (tree.size[node] < self.theta * distance) & ~inside
+            far = targets[accepted]
+            if len(far) > 0:
+                output[far] += kernel(position[far], magnitude[far], tree.position[node], tree.magnitude[node])
+            near = targets[~accepted]
+            if len(near) == 0: continue
+            for child in range(tree.first[node], tree.first[node] + tree.children[node]): stack.append((child, near))
+        return output
+
+#rows of positions, zero-padded to a common dimensionality
+def stack(vectors: list[Vector]) -> np.ndarray:
+    dimensionality = max([len(vector) for vector in vectors], default = 0)
+    output = np.zeros((len(vectors), dimensionality))
+    for row, vector in enumerate(vectors):
+        output[row, :len(vector)] = [float(scalar) for scalar in vector]
+    return output
+
+#cell-list built Verlet neighbour lists, rebuilt once any particle drifts past half the skin
+class Neighbours:
+    SKIN = 0.2
+
+    def __init__(self, cutoff: float, skin: float = None) -> None:
+        if cutoff <= 0: raise ValueError('cutoff must be positive')
+        self.cutoff = float(cutoff)
+        self.skin = float(skin) if skin != None else self.cutoff * Neighbours.SKIN
+        self.reference: np.ndarray = None
+        self.members: Union[list, np.ndarray] = None
+        self.i = self.j = np.zeros(0, dtype = int)
+        self.rebuilds = 0
+
+    def __is_stale__(self, position: np.ndarray, members: Union[list, np.ndarray]) -> bool:
+        if self.reference is None or self.reference.shape != position.shape: return True
+        if not np.array_equal(self.members, members): return True
+        displacement = np.einsum('ij,ij->i', position - self.reference, position - self.reference)
+        return len(displacement) > 0 and displacement.max() > (self.skin / 2) ** 2
+
+    def build(self, position: np.ndarray) -> None:
+        n, dimensionality = position.shape
+        radius = self.cutoff + self.skin
+        self.i = self.j = np.zeros(0, dtype = int)
+        if n < 2: return None
+        cell = np.floor((position - position.min(axis = 0)) / radius).astype(np.int64)
+        #per-axis rank compression keeps the linear cell key bounded by n ** dimensionality
+        axes = [np.unique(cell[:, k]) for k in range(dimensionality)]
+        shape = tuple(len(axis) for axis in axes)
+        rank = np.stack([np.searchsorted(axes[k], cell[:, k]) for k in range(dimensionality)])
+        key = np.ravel_multi_index(rank, shape)
+        order = np.argsort(key, kind = 'stable')
+        ordered_key = key[order]
+        particles = np.arange(n)
+        pairs_i, pairs_j = [], []
+        for offset in product((-1, 0, 1), repeat = dimensionality):
+            target = cell + np.array(offset)
+            valid = np.ones(n, dtype = bool)
+            target_rank = []
+            for k, axis in enumerate(axes):
+                r = np.clip(np.searchsorted(axis, target[:, k]), 0, len(axis) - 1)
+                valid &= axis[r] == target[:, k]
+                target_rank.append(r)
+            source = particles[valid]
+            if len(source) == 0: continue
+            target_key = np.ravel_multi_index(np.stack(target_rank)[:, valid], shape)
+            start = np.searchsorted(ordered_key, target_key, side = 'left')
+            counts = np.searchsorted(ordered_key, target_key, side = 'right') - start
+            total = counts.sum()
+            if total == 0: continue
+            i = np.repeat(source, counts)
+            within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(start, counts) + within]
+            #each unordered pair is kept once
+            keep = i < j
+            pairs_i.append(i[keep])
+            pairs_j.append(j[keep])
+        if len(pairs_i) == 0: return None
+        i, j = np.concatenate(pairs_i), np.concatenate(pairs_j)
+        delta_position = position[j] - position[i]
+        keep = np.einsum('ij,ij->i', delta_position, delta_position) <= radius ** 2
+        order = np.lexsort((j[keep], i[keep]))
+        self.i, self.j = i[keep][order], j[keep][order]
+
+    def pairs(
+            self,
+            position: np.ndarray,
+            members: Union[list, np.ndarray]
+        ) -> tuple[np.ndarray, np.ndarray]:
+        if self.__is_stale__(position, members):
+            self.build(position)
+            self.reference = position.copy()
+            self.members = np.array(members, copy = True)
+            self.rebuilds += 1
+        i, j = self.i, self.j
+        delta_position = position[j] - position[i]
+        within = np.einsum('ij,ij->i', delta_position, delta_position) <= self.cutoff ** 2
+        return i[within], j[within]
@@ -0,0 +1,264 @@
+from __future__ import annotations
+from typing import Union, Optional, Any
+import numpy as np
+from engine import Vector, Kinematics, Particle, Ensemble, Force
+from engine.util.typing import Number, Array
+from engine.util.numeric import Numeric, DecimalNumeric
+
+def flatten(tensor: Union[Vector, Number, Array], dimensionality: int) -> np.ndarray:
+    #scalars broadcast, vectors zero-pad (as Vector arithmetic does)
+    if isinstance(tensor, Number): return np.full(dimensionality, float(tensor))
+    if isinstance(tensor, Vector): tensor = tensor.vector
+    scalars = [float(scalar) for scalar in tensor]
+    if len(scalars) > dimensionality: raise ValueError(f'tensor exceeds store dimensionality of {dimensionality}')
+    return np.array(scalars + [0.0] * (dimensionality - len(scalars)))
+
+#(n, dimensionality) rows of tensors, one tensor broadcasting to every row, None being zeros, narrower rows zero-padded
+def block(tensors: Any, n: int, dimensionality: int) -> np.ndarray:
+    if tensors is None: return np.zeros((n, dimensionality))
+    if isinstance(tensors, Vector): tensors = tensors.vector
+    try: array = np.asarray(tensors, dtype = float)
+    #ragged rows, or rows of Vectors
+    except (ValueError, TypeError): array = np.array([flatten(tensor, dimensionality) for tensor in tensors]).reshape(-1, dimensionality)
+    if array.ndim == 1: array = np.broadcast_to(array, (n, len(array)))
+    if array.ndim != 2 or len(array) != n: raise ValueError(f'expected {n} rows')
+    if array.shape[1] > dimensionality: raise ValueError(f'tensor exceeds store dimensionality of {dimensionality}')
+    output = np.zeros((n, dimensionality))
+    output[:, :array.shape[1]] = array
+    return output
+
+class KinematicsView(Kinematics):
+    def __init__(self, particle: ParticleView) -> None:
+        self.particle = particle
+
+    #store array holding this degree, one row per particle
+    def column(self, degree: int) -> np.ndarray:
+        store = self.particle.store
+        if degree == 1: return store.velocity
+        elif degree == 2: return store.acceleration
+        raise ValueError('particle store only holds velocity and acceleration degrees')
+
+    @property
+    def velocity(self) -> Vector:
+        return self.degrees[0]
+
+    @property
+    def degrees(self) -> list[Vector]:
+        row = self.particle.row
+        return [
+            self.particle.store.vector(self.column(degree)[row])
+            for degree in (1, 2)
+        ]
+
+    def set_motion(self, vector: Vector, degree: int) -> None:
+        array = self.column(degree)
+        array[self.particle.row] = flatten(vector, array.shape[1])
+
+    def add_motion(self, vector: Vector, degree: int) -> None:
+        array = self.column(degree)
+        array[self.particle.row] += flatten(vector, array.shape[1])
+
+class ParticleView(Particle):
+    def __init__(
+            self,
+            store: ParticleStore,
+            id: str,
+            row: int,
+            ensemble: Ensemble = None
+        ) -> None:
+        self.store = store
+        self.id = id
+        self.row = row
+        self.ensemble = ensemble
+        self.kinematics = KinematicsView(self)
+
+    @property
+    def position(self) -> Vector:
+        return self.store.vector(self.store.position[self.row])
+
+    @position.setter
+    def position(self, position: Vector) -> None:
+        self.store.position[self.row] = flatten(position, self.store.dimensionality)
+
+class ParticleStore:
+    def __init__(
+            self,
+            dimensionality: int = 3,
+            numeric: Numeric = None,
+            capacity: int = 64
+        ) -> None:
+        self.dimensionality = dimensionality
+        #backend of the Vectors handed out by views
+        self.numeric = numeric if numeric != None else DecimalNumeric()
+        self.capacity = max(capacity, 1)
+        self.size = 0
+        shape = (self.capacity, dimensionality)
+        self.position = np.zeros(shape)
+        self.velocity = np.zeros(shape)
+        self.acceleration = np.zeros(shape)
+        #per-field (g)id columns, e.g. mass and charge
+        self.magnitude: dict[str, np.ndarray] = {}
+        self.center: dict[str, np.ndarray] = {}
+        self.member: dict[str, np.ndarray] = {}
+        #row <-> (u)id
+        self.ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.views: list[ParticleView] = []
+        #bumped on every append and remove, for row orders cached elsewhere
+        self.changes = 0
+
+    def __grow__(self, size: int) -> None:
+        if size <= self.capacity: return None
+        capacity = self.capacity
+        while capacity < size: capacity *= 2
+        def resize(array: np.ndarray) -> np.ndarray:
+            output = np.zeros((capacity, *array.shape[1:]), dtype = array.dtype)
+            output[:self.size] = array[:self.size]
+            return output
+        for key in ('position', 'velocity', 'acceleration'):
+            setattr(self, key, resize(getattr(self, key)))
+        for columns in (self.magnitude, self.center, self.member):
+            for gid, array in columns.items(): columns[gid] = resize(array)
+        self.capacity = capacity
+
+    def __column__(self, gid: str) -> None:
+        if gid in self.member: return None
+        self.magnitude[gid] = np.zeros(self.capacity)
+        self.center[gid] = np.zeros((self.capacity, self.dimensionality))
+        self.member[gid] = np.zeros(self.capacity, dtype = bool)
+
+    def append(
+            self,
+            id: str,
+            position: Union[Vector, Array],
+            kinematics: Kinematics,
+            ensemble: Optional[Ensemble] = None
+        ) -> ParticleView:
+        degrees = [degree for degree in kinematics.degrees if len(degree) > 0]
+        if len(degrees) > 2: raise ValueError('particle store only holds velocity and acceleration degrees')
+        self.__grow__(self.size + 1)
+        row = self.size
+        self.size += 1
+        self.position[row] = flatten(position, self.dimensionality)
+        self.velocity[row] = flatten(kinematics.degrees[0], self.dimensionality) if len(kinematics.degrees) > 0 else 0
+        self.acceleration[row] = flatten(kinematics.degrees[1], self.dimensionality) if len(kinematics.degrees) > 1 else 0
+        forces: list[Force] = ensemble.forces if ensemble != None else []
+        for force in forces:
+            self.__column__(force.id)
+            self.magnitude[force.id][row] = float(force.magnitude)
+            self.center[force.id][row] = flatten(force.center, self.dimensionality)
+            self.member[force.id][row] = True
+        view = ParticleView(self, id, row, ensemble)
+        self.ids.append(id)
+        self.rows[id] = row
+        self.views.append(view)
+        self.changes += 1
+        return view
+
+    def remove(self, id: str) -> None:
+        row = self.rows.pop(id)
+        last = self.size - 1
+        #swap-with-last keeps rows contiguous
+        if row != last:
+            for array in (self.position, self.velocity, self.acceleration, *self.magnitude.values(), *self.center.values(), *self.member.values()):
+                array[row] = array[last]
+            view = self.views[last]
+            view.row = row
+            self.views[row] = view
+            self.ids[row] = view.id
+            self.rows[view.id] = row
+        for array in (self.position, self.velocity, self.acceleration, *self.magnitude.values(), *self.center.values(), *self.member.values()):
+            array[last] = 0
+        self.views.pop()
+        self.ids.pop()
+        self.size -= 1
+        self.changes += 1
+
+    #append for many particles of one ensemble, rows filled in one array operation per column
+    def extend(
+            self,
+            ids: list[str],
+            position: Any,
+            velocity: Any = None,
+            ensemble: Optional[Ensemble] = None
+        ) -> list[ParticleView]:
+        n = len(ids)
+        position = block(position, n, self.dimensionality)
+        velocity = block(velocity, n, self.dimensionality)
+        self.__grow__(self.size + n)
+        rows = slice(self.size, self.size + n)
+        self.position[rows] = position
+        self.velocity[rows] = velocity
+        self.acceleration[rows] = 0
+        forces: list[Force] = ensemble.forces if ensemble != None else []
+        for force in forces:
+            self.__column__(force.id)
+            self.magnitude[force.id][rows] = float(force.magnitude)
+            self.center[force.id][rows] = flatten(force.center, self.dimensionality)
+            self.member[force.id][rows] = True
+        views = [ParticleView(self, id, row, ensemble) for row, id in enumerate(ids, self.size)]
+        self.ids.extend(ids)
+        self.rows.update(zip(ids, range(self.size, self.size + n)))
+        self.views.extend(views)
+        self.size += n
+        self.changes += 1
+        return views
+
+    #remove for many particles, the remaining rows compacted in order (rather than swapped with the last)
+    def remove_all(self, ids: list[str]) -> None:
+        ids = list(dict.fromkeys(ids))
+        #every id checked first, an unknown one leaves the store untouched
+        for id in ids:
+            if id not in self.rows: raise KeyError(id)
+        removed = np.zeros(self.size, dtype = bool)
+        removed[[self.rows.pop(id) for id in ids]] = True
+        keep = np.flatnonzero(~removed)
+        m = len(keep)
+        for array in (self.position, self.velocity, self.acceleration, *self.magnitude.values(), *self.center.values(), *self.member.values()):
+            array[:m] = array[keep]
+            array[m:self.size] = 0
+        self.views = [self.views[row] for row in keep.tolist()]
+        self.ids = [view.id for view in self.views]
+        for row, view in enumerate(self.views):
+            view.row = row
+            self.rows[view.id] = row
+        self.size = m
+        self.changes += 1
+
+    def vector(self, row: np.ndarray) -> Vector:
+        with self.numeric:
+            return Vector.decimalize(Vector(*row.tolist()))
+
+    def flatten(self, tensor: Union[Vector, Number, Array]) -> np.ndarray:
+        return flatten(tensor, self.dimensionality)
+
+    #accumulates into acceleration, rows may repeat
+    def accelerate(self, rows: np.ndarray, acceleration: np.ndarray) -> None:
+        np.add.at(self.acceleration, rows, acceleration)
+
+    #indices into rows of the target rows, None (every row) without targets
+    def within(self, rows: np.ndarray, targets: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if targets is None: return None
+        return np.flatnonzero(np.isin(rows, targets))
+
+    #whether each of index is among local, out of size
+    def among(self, local: np.ndarray, size: int, index: np.ndarray) -> np.ndarray:
+        mask = np.zeros(size, dtype = bool)
+        mask[local] = True
+        return mask[index]
+
+    def members(self, gid: str) -> np.ndarray:
+        if gid not in self.member: return np.zeros(0, dtype = int)
+        return np.flatnonzero(self.member[gid][:self.size])
+
+    def positions(self) -> np.ndarray:
+        return self.position[:self.size]
+
+    def velocities(self) -> np.ndarray:
+        return self.velocity[:self.size]
+
+    def accelerations(self) -> np.ndarray:
+        return self.acceleration[:self.size]
+
+    def __len__(self) -> int:
+        return self.size
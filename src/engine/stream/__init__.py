@@ -0,0 +1,140 @@
+from __future__ import annotations
+from base64 import b64encode
+import numpy as np
+from engine import Field, Ensemble, Particle, Engine, index_for_object
+from engine.util.typing import Object
+from engine.trajectory import pad
+
+#typed-array frames for a front end: one static snapshot, then only time, positions and velocities
+#base64 little-endian arrays, (n, d) row-major, decoded by web/js/eel.js
+ENCODINGS = ['float32', 'quantized', 'delta']
+#int16 range used by quantized values
+QUANTA = 32767
+
+def encode(array: np.ndarray, dtype: str) -> str:
+    return b64encode(np.ascontiguousarray(array, dtype = dtype).tobytes()).decode('ascii')
+
+#a discarded frame's snapshot moves onto the next frame of the same revision, e.g. when frames are dropped or skipped
+def carry(discarded: dict, frame: dict) -> None:
+    if 'snapshot' in discarded and 'snapshot' not in frame and discarded['revision'] == frame['revision']:
+        frame['snapshot'] = discarded['snapshot']
+
+#one per-frame array (positions or velocities), with the client's reconstruction kept for deltas
+class Channel:
+    def __init__(self, encoding: str, keyframe: int) -> None:
+        self.encoding = encoding
+        self.keyframe = keyframe
+        self.reference: np.ndarray = None
+        self.frames = 0
+
+    def reset(self) -> None:
+        self.reference = None
+        self.frames = 0
+
+    def encode(self, array: np.ndarray) -> dict:
+        if self.encoding == 'float32': return {'encoding': 'float32', 'data': encode(array, '<f4')}
+        elif self.encoding == 'quantized':
+            #per axis over the frame's bounds
+            lower = array.min(axis = 0) if len(array) > 0 else np.zeros(array.shape[1])
+            scale = (array.max(axis = 0) - lower) / (2 * QUANTA) if len(array) > 0 else np.zeros(array.shape[1])
+            scale[scale == 0] = 1
+            quanta = np.rint((array - lower) / scale) - QUANTA
+            return {'encoding': 'quantized', 'offset': (lower + QUANTA * scale).tolist(), 'scale': scale.tolist(), 'data': encode(quanta, '<i2')}
+        is_keyframe = self.reference is None or self.reference.shape != array.shape or self.frames % self.keyframe == 0
+        self.frames += 1
+        if is_keyframe:
+            self.reference = np.array(array, dtype = float)
+            return {'encoding': 'keyframe', 'data': encode(self.reference, '<f8')}
+        #deltas against what the client holds, so quantization error never accumulates
+        delta = array - self.reference
+        scale = np.abs(delta).max(axis = 0) / QUANTA if len(delta) > 0 else np.zeros(delta.shape[1])
+        scale[scale == 0] = 1
+        quanta = np.rint(delta / scale)
+        self.reference += quanta * scale
+        return {'encoding': 'delta', 'scale': scale.tolist(), 'data': encode(quanta, '<i2')}
+
+class Stream:
+    KEYFRAME = 60
+
+    def __init__(
+            self,
+            engine: Engine,
+            encoding: str = 'float32',
+            keyframe: int = KEYFRAME,
+            velocities: bool = True
+        ) -> None:
+        if encoding not in ENCODINGS: raise ValueError(f'encoding must be one of {ENCODINGS}')
+        self.engine = engine
+        self.encoding = encoding
+        self.velocities = velocities
+        self.position = Channel(encoding, keyframe)
+        self.velocity = Channel(encoding, keyframe)
+        self.revision = 0
+        self.ids: list[str] = None
+        self.changes = None
+
+    def __stale__(self) -> bool:
+        store = self.engine.store
+        if store != None: return self.changes != store.changes
+        return self.ids != list(self.engine.objects)
+
+    def __dimensionality__(self) -> int:
+        store = self.engine.store
+        if store != None: return store.dimensionality
+        return max([len(index_for_object(object).position) for object in self.engine.objects.values()], default = 1)
+
+    #static fields and ensembles, and the particle order every following frame uses
+    def snapshot(self) -> dict:
+        engine = self.engine
+        store = engine.store
+        if store != None:
+            self.ids = list(store.ids)
+            self.changes = store.changes
+            particles = store.views
+        else:
+            self.ids = list(engine.objects)
+            particles: list[Particle] = [index_for_object(object) for object in engine.objects.values()]
+        self.dimensionality = self.__dimensionality__()
+        self.revision += 1
+        self.position.reset()
+        self.velocity.reset()
+        groups = [index_for_object(attributes) for attributes in engine.attributes.values() if Object in attributes]
+        return {
+            'revision': self.revision,
+            'dimensionality': self.dimensionality,
+            'fields': [
+                {'id': field.id, 'name': field.name, 'units': field.units}
+                for field in groups if isinstance(field, Field)
+            ],
+            'ensembles': [ensemble.dumps() for ensemble in groups if isinstance(ensemble, Ensemble)],
+            'particles': {
+                'ids': self.ids,
+                'ensembles': [particle.ensemble.id if particle.ensemble != None else None for particle in particles]
+            }
+        }
+
+    def __arrays__(self) -> tuple[np.ndarray, np.ndarray]:
+        store = self.engine.store
+        if store != None: return store.positions(), store.velocities()
+        position = np.zeros((len(self.ids), self.dimensionality))
+        velocity = np.zeros((len(self.ids), self.dimensionality))
+        for i, object in enumerate(self.engine.objects.values()):
+            particle: Particle = index_for_object(object)
+            degrees = particle.kinematics.degrees
+            position[i] = pad(particle.position, self.dimensionality)
+            velocity[i] = pad(degrees[0] if len(degrees) > 0 else None, self.dimensionality)
+        return position, velocity
+
+    #time, positions and velocities, with a new snapshot whenever particles were added or removed
+    def frame(self) -> dict:
+        frame = {}
+        if self.ids == None or self.__stale__(): frame['snapshot'] = self.snapshot()
+        position, velocity = self.__arrays__()
+        frame.update({
+            'revision': self.revision,
+            'time': float(self.engine.time),
+            'count': len(self.ids),
+            'position': self.position.encode(position)
+        })
+        if self.velocities: frame['velocity'] = self.velocity.encode(velocity)
+        return frame
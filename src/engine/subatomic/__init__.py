@@ -1,12 +1,21 @@
-from typing import Union
+from typing import Union, Any
 from engine import Vector, Particle, Kinematics, Ensemble, Engine
 from engine.formula import gravity, electrostatic
 from engine.util.typing import Number, Array
 
 #by inheritance
 class SubatomicEngine(Engine):
-    def __init__(self, precision: int = 50) -> None:
-        super().__init__(precision)
+    def __init__(
+            self,
+            precision: int = 50,
+            store: bool = False,
+            dimensionality: int = 3,
+            numeric: str = 'decimal',
+            integrator: str = 'taylor',
+            workers: int = None,
+            random_ids: bool = False
+        ) -> None:
+        super().__init__(precision, store, dimensionality, numeric, integrator, workers, random_ids)
         self.gravitational_field = self.add_field(
             'gravity',
             formula = gravity,
@@ -68,3 +77,13 @@ class SubatomicEngine(Engine):
             velocity: Union[Vector, Array] = ()
         ) -> Particle:
         return self.add_particle(position, kinematics = velocity, ensemble = self.electron_ensemble)
+
+    #many at once, see Engine.add_particles
+    def add_protons(self, positions: Any, velocities: Any = None) -> list[Particle]:
+        return self.add_particles(positions, velocities, self.proton_ensemble)
+
+    def add_neutrons(self, positions: Any, velocities: Any = None) -> list[Particle]:
+        return self.add_particles(positions, velocities, self.neutron_ensemble)
+
+    def add_electrons(self, positions: Any, velocities: Any = None) -> list[Particle]:
+        return self.add_particles(positions, velocities, self.electron_ensemble)
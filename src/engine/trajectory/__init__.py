@@ -0,0 +1,150 @@
+from __future__ import annotations
+from typing import Union, Optional
+from os import PathLike
+from os.path import getsize
+from struct import Struct
+import json
+import numpy as np
+from engine import Vector, Particle, Engine, index_for_object
+
+#file layout: magic, version, header length, JSON header (particle ids, ensembles, dimensionality),
+#zero-padded to ALIGNMENT, then fixed-size frames of time, positions (n, d) and velocities (n, d), float64
+MAGIC = b'SUBTRAJ\x00'
+VERSION = 1
+PREAMBLE = Struct('<8sII')
+ALIGNMENT = 64
+
+def frame_dtype(n: int, dimensionality: int) -> np.dtype:
+    return np.dtype([
+        ('time', '<f8'),
+        ('position', '<f8', (n, dimensionality)),
+        ('velocity', '<f8', (n, dimensionality))
+    ])
+
+def pad(vector: Vector, dimensionality: int) -> list[float]:
+    scalars = [float(scalar) for scalar in vector] if isinstance(vector, Vector) else []
+    return (scalars + [0.0] * dimensionality)[:dimensionality]
+
+#appends engine frames to a trajectory file, buffered chunk frames at a time
+class TrajectoryWriter:
+    CHUNK = 64
+
+    def __init__(
+            self,
+            path: Union[str, PathLike],
+            engine: Engine,
+            chunk: int = CHUNK,
+            dimensionality: Optional[int] = None
+        ) -> None:
+        self.engine = engine
+        self.store = engine.store
+        particles: list[Particle] = [index_for_object(object) for object in engine.objects.values()]
+        self.ids = [particle.id for particle in particles]
+        if dimensionality == None:
+            if self.store != None: dimensionality = self.store.dimensionality
+            else: dimensionality = max([len(particle.position) for particle in particles], default = 1)
+        self.dimensionality = dimensionality
+        self.dtype = frame_dtype(len(self.ids), dimensionality)
+        self.buffer = np.zeros(max(chunk, 1), dtype = self.dtype)
+        self.pending = 0
+        self.frames = 0
+        #store row of each recorded particle, rebuilt when the store changes
+        self.rows: np.ndarray = None
+        self.changes = None
+        ensembles = {}
+        for particle in particles:
+            if particle.ensemble != None: ensembles[particle.ensemble.id] = particle.ensemble.name
+        header = json.dumps({
+            'version': VERSION,
+            'dimensionality': dimensionality,
+            'particles': [
+                {'id': particle.id, 'ensemble': particle.ensemble.id if particle.ensemble != None else None}
+                for particle in particles
+            ],
+            'ensembles': ensembles
+        }).encode('UTF-8')
+        length = PREAMBLE.size + len(header)
+        header += b'\x00' * (-length % ALIGNMENT)
+        self.file = open(path, 'wb')
+        self.file.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        self.file.write(header)
+
+    def __rows__(self) -> np.ndarray:
+        if self.changes != self.store.changes:
+            if self.store.size != len(self.ids) or any(id not in self.store.rows for id in self.ids):
+                raise ValueError('particles changed since the trajectory header was written')
+            self.rows = np.array([self.store.rows[id] for id in self.ids], dtype = int)
+            self.changes = self.store.changes
+        return self.rows
+
+    def record(self) -> None:
+        frame = self.buffer[self.pending]
+        frame['time'] = float(self.engine.time)
+        if self.store != None:
+            rows = self.__rows__()
+            frame['position'][:, :self.store.dimensionality] = self.store.positions()[rows]
+            frame['velocity'][:, :self.store.dimensionality] = self.store.velocities()[rows]
+        else:
+            if len(self.engine.objects) != len(self.ids): raise ValueError('particles changed since the trajectory header was written')
+            position, velocity = frame['position'], frame['velocity']
+            for i, id in enumerate(self.ids):
+                if id not in self.engine.objects: raise ValueError('particles changed since the trajectory header was written')
+                particle: Particle = index_for_object(self.engine.objects[id])
+                degrees = particle.kinematics.degrees
+                position[i] = pad(particle.position, self.dimensionality)
+                velocity[i] = pad(degrees[0] if len(degrees) > 0 else None, self.dimensionality)
+        self.pending += 1
+        self.frames += 1
+        if self.pending == len(self.buffer): self.flush()
+
+    def flush(self) -> None:
+        if self.pending > 0:
+            self.file.write(self.buffer[:self.pending].tobytes())
+            self.pending = 0
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file.closed: return None
+        self.flush()
+        self.file.close()
+
+    def __enter__(self) -> TrajectoryWriter:
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+#memory-mapped trajectory, frames and particles are only read from disk when indexed
+class Trajectory:
+    def __init__(self, path: Union[str, PathLike]) -> None:
+        with open(path, 'rb') as file:
+            magic, version, length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+            if magic != MAGIC: raise ValueError(f'{path} is not a trajectory file')
+            if version > VERSION: raise ValueError(f'trajectory version {version} is newer than {VERSION}')
+            self.header = json.loads(file.read(length).rstrip(b'\x00').decode('UTF-8'))
+        self.ids: list[str] = [particle['id'] for particle in self.header['particles']]
+        self.ensembles: list[Optional[str]] = [particle['ensemble'] for particle in self.header['particles']]
+        self.dimensionality: int = self.header['dimensionality']
+        self.index = {id: i for i, id in enumerate(self.ids)}
+        self.dtype = frame_dtype(len(self.ids), self.dimensionality)
+        offset = PREAMBLE.size + length
+        #a partially written trailing frame is ignored
+        count = (getsize(path) - offset) // self.dtype.itemsize
+        if count > 0: self.frames = np.memmap(path, dtype = self.dtype, mode = 'r', offset = offset, shape = (count,))
+        else: self.frames = np.zeros(0, dtype = self.dtype)
+        self.time: np.ndarray = self.frames['time']
+        self.position: np.ndarray = self.frames['position']
+        self.velocity: np.ndarray = self.frames['velocity']
+
+    #frames' (time, positions, velocities)
+    def __getitem__(self, frame: Union[int, slice]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.time[frame], self.position[frame], self.velocity[frame]
+
+    #one particle's positions and velocities over frames
+    def particle(self, id: str, frames: Union[int, slice] = slice(None)) -> tuple[np.ndarray, np.ndarray]:
+        if id not in self.index: raise ValueError(f'no particle {id} in trajectory')
+        i = self.index[id]
+        return self.position[frames, i], self.velocity[frames, i]
+
+    def __len__(self) -> int:
+        return len(self.frames)
@@ -0,0 +1,4 @@
+#termcolor, imported on first use so headless runs never load it
+def colored(*args, **kwargs) -> str:
+    from termcolor import colored
+    return colored(*args, **kwargs)
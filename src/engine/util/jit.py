@@ -0,0 +1,9 @@
+try: from numba import njit
+except ImportError: njit = None
+
+JIT = njit != None
+
+#compiles with numba (cached on disk) when installed, otherwise leaves the function as pure Python
+def jit(function):
+    if njit == None: return function
+    return njit(cache = True)(function)
@@ -0,0 +1,72 @@
+from contextvars import ContextVar
+from decimal import Decimal, Context, getcontext, setcontext
+from math import sqrt as float_sqrt
+
+class Numeric:
+    NAME = None
+
+    def __init__(self) -> None:
+        self.tokens = []
+
+    def scalar(self, n):
+        raise NotImplementedError
+
+    def __enter__(self):
+        self.tokens.append(ACTIVE.set(self))
+        return self
+
+    def __exit__(self, *exception) -> None:
+        ACTIVE.reset(self.tokens.pop())
+
+    def __repr__(self) -> str:
+        return self.NAME
+
+#arbitrary-precision, through str() so float literals keep their shortest repr
+class DecimalNumeric(Numeric):
+    NAME = 'decimal'
+
+    #precision None keeps the ambient (thread/task-local) decimal context
+    def __init__(self, precision: int = None) -> None:
+        super().__init__()
+        self.precision = precision
+        self.context = Context(prec = precision) if precision != None else None
+
+    def __enter__(self):
+        previous = None
+        if self.context != None:
+            previous = getcontext()
+            setcontext(self.context)
+        self.tokens.append((ACTIVE.set(self), previous))
+        return self
+
+    def __exit__(self, *exception) -> None:
+        token, previous = self.tokens.pop()
+        ACTIVE.reset(token)
+        if previous != None: setcontext(previous)
+
+    def scalar(self, n) -> Decimal:
+        if type(n) is Decimal: return n
+        return Decimal(str(n))
+
+#float64 fast-path, no decimalization
+class FloatNumeric(Numeric):
+    NAME = 'float'
+
+    def scalar(self, n) -> float:
+        return float(n)
+
+NUMERICS = {numeric.NAME: numeric for numeric in (DecimalNumeric, FloatNumeric)}
+
+ACTIVE = ContextVar('numeric', default = DecimalNumeric())
+
+def active() -> Numeric:
+    return ACTIVE.get()
+
+def numeric(name: str, precision: int = None) -> Numeric:
+    if name not in NUMERICS: raise ValueError(f'numeric backend must be one of {list(NUMERICS)}')
+    if name == DecimalNumeric.NAME: return DecimalNumeric(precision)
+    return NUMERICS[name]()
+
+def sqrt(n):
+    if isinstance(n, Decimal): return n.sqrt()
+    return float_sqrt(n)
@@ -38,15 +38,51 @@ BINARY_NUMERIC_OPERATORS = [
     xor
 ]
 
+#infix (or prefix, for unary) symbol of each operator, inlined into generated methods
+SYMBOLS = {
+    add: '+', and_: '&', floordiv: '//', ge: '>=', gt: '>',
+    iadd: '+', iand: '&', ifloordiv: '//', ilshift: '<<', imatmul: '@', imod: '%', imul: '*',
+    ior: '|', ipow: '**', irshift: '>>', isub: '-', itruediv: '/', ixor: '^',
+    le: '<=', lshift: '<<', lt: '<', matmul: '@', mod: '%', mul: '*', ne: '!=',
+    neg: '-', or_: '|', pos: '+', pow: '**', rshift: '>>', sub: '-', truediv: '/', xor: '^'
+}
+UNARY_OPERATORS = [neg, pos]
+
+def generate(name: str, source: str, namespace: dict) -> Callable:
+    scope = {}
+    exec(compile(source, f'<{name}>', 'exec'), namespace, scope)
+    return scope[name]
+
 class BinaryNumericOverload:
+    __slots__ = ()
+    #source templates, formatted per operator with {name}, {symbol} and {is_augmented}
+    #None falls back to methods forwarding to __operation__
+    __OPERATION__: str = None
+    __UNARY_OPERATION__: str = None
+
     def __init_subclass__(parent, **kwargs):
         super().__init_subclass__(**kwargs)
         for operator in BINARY_NUMERIC_OPERATORS:
             name = operator.__name__
             dunder = Dunder(name)
-            parent_operator = parent.create_operator(operator, dunder.is_augmented)
+            parent_operator = parent.specialise_operator(operator, dunder.name, dunder.is_augmented)
+            if parent_operator == None: parent_operator = parent.create_operator(operator, dunder.is_augmented)
             setattr(parent, dunder.name, parent_operator)
 
+    #names a generated method may use, besides builtins
+    @classmethod
+    def namespace(parent) -> dict:
+        return {parent.__name__: parent}
+
+    @classmethod
+    def specialise_operator(parent, operator, name, is_augmented):
+        template = parent.__UNARY_OPERATION__ if operator in UNARY_OPERATORS else parent.__OPERATION__
+        if template == None: return None
+        source = template.format(name = name, symbol = SYMBOLS[operator], is_augmented = is_augmented)
+        method = generate(name, source, parent.namespace())
+        method.__qualname__ = f'{parent.__qualname__}.{name}'
+        return method
+
     @staticmethod
     def create_operator(operator, is_augmented):
         def operator_method(self, other):
@@ -1,10 +1,12 @@
 from typing import Union, Literal
 from decimal import Decimal
+from engine.util.numeric import active
 
 Zero = Literal[0]
 Number = Union[int, float, Decimal]
 Array = Union[list, tuple]
 Object = object
 
-def decimalize(n: Number) -> Decimal:
-    return Decimal(str(n))
+#scalar in the active numeric backend, Decimal unless an engine selects otherwise
+def decimalize(n: Number) -> Number:
+    return active().scalar(n)
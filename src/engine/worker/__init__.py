@@ -0,0 +1,160 @@
+from __future__ import annotations
+from typing import Callable, Optional, Any
+from collections import deque
+from threading import Thread, Condition, RLock, Event
+from time import perf_counter
+from engine import Engine
+from engine.util.typing import Number
+
+#producer thread stepping an engine into a bounded ring buffer of frames, consumers never block the physics
+#policies when the buffer is full:
+#   'block' waits for a consumer (backpressure), every frame is kept
+#   'drop-oldest' overwrites the oldest frame, consumers always see the newest
+#   'drop-newest' discards the new frame, consumers see an unbroken (if stale) sequence
+POLICIES = ['block', 'drop-oldest', 'drop-newest']
+
+class SimulationWorker:
+    CAPACITY = 64
+
+    def __init__(
+            self,
+            engine: Engine,
+            t: Number,
+            steps: int = 1,
+            frame: Optional[Callable[[], Any]] = None,
+            capacity: int = CAPACITY,
+            policy: str = 'drop-oldest',
+            rate: Optional[float] = None,
+            carry: Optional[Callable[[Any, Any], None]] = None
+        ) -> None:
+        if policy not in POLICIES: raise ValueError(f'policy must be one of {POLICIES}')
+        if steps < 1 or capacity < 1: raise ValueError
+        self.engine = engine
+        self.t = t
+        #steps of t per frame
+        self.steps = steps
+        #frame producer, engine.stream frames (float32) by default
+        from engine.stream import Stream, carry as stream_carry
+        if frame == None:
+            frame = Stream(engine).frame
+            if carry == None: carry = stream_carry
+        #a dropped delta frame breaks the chain every later frame is rebuilt from (consume them with get(), not latest())
+        stream = getattr(frame, '__self__', None)
+        if isinstance(stream, Stream) and stream.encoding == 'delta' and policy != 'block':
+            raise ValueError(f"delta encoded stream frames need the 'block' policy, not '{policy}'")
+        self.frame = frame
+        #carry(discarded, next) keeps what a dropped or skipped frame must not lose, e.g. stream snapshots
+        self.carry = carry
+        self.discarded: Any = None
+        self.policy = policy
+        #frames per second ceiling, None runs flat out
+        self.rate = rate
+        self.frames: deque = deque(maxlen = capacity if policy == 'drop-oldest' else None)
+        self.capacity = capacity
+        self.condition = Condition()
+        #held while stepping, take it to change the engine (e.g. add particles) from another thread
+        self.lock = RLock()
+        self.stopping = Event()
+        self.thread: Thread = None
+        self.error: BaseException = None
+        self.produced = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.last: Any = None
+
+    def start(self) -> SimulationWorker:
+        if self.running(): return self
+        self.stopping.clear()
+        self.error = None
+        self.thread = Thread(target = self.__run__, name = 'simulation', daemon = True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.stopping.set()
+        with self.condition: self.condition.notify_all()
+        if self.thread != None: self.thread.join(timeout)
+
+    def running(self) -> bool:
+        return self.thread != None and self.thread.is_alive()
+
+    def __run__(self) -> None:
+        try:
+            while not self.stopping.is_set():
+                begin = perf_counter()
+                with self.lock:
+                    self.engine.run(self.steps, self.t)
+                    frame = self.frame()
+                self.__push__(frame)
+                if self.rate != None:
+                    remaining = 1 / self.rate - (perf_counter() - begin)
+                    if remaining > 0: self.stopping.wait(remaining)
+        except BaseException as error:
+            self.error = error
+        finally:
+            with self.condition: self.condition.notify_all()
+
+    def __discard__(self, discarded: Any, frame: Any) -> None:
+        if self.carry != None: self.carry(discarded, frame)
+
+    def __push__(self, frame: Any) -> None:
+        with self.condition:
+            if self.discarded is not None:
+                self.__discard__(self.discarded, frame)
+                self.discarded = None
+            if self.policy == 'block':
+                while len(self.frames) >= self.capacity and not self.stopping.is_set(): self.condition.wait()
+                if self.stopping.is_set(): return None
+            elif self.policy == 'drop-newest' and len(self.frames) >= self.capacity:
+                self.discarded = frame
+                self.dropped += 1
+                return None
+            elif self.policy == 'drop-oldest' and len(self.frames) == self.capacity:
+                evicted = self.frames.popleft()
+                self.__discard__(evicted, self.frames[0] if len(self.frames) > 0 else frame)
+                self.dropped += 1
+            self.frames.append(frame)
+            self.produced += 1
+            self.condition.notify_all()
+
+    def __check__(self) -> None:
+        if self.error != None: raise RuntimeError('simulation worker failed') from self.error
+
+    #newest frame without blocking, older buffered frames are skipped, the previous frame again if nothing new
+    def latest(self) -> Any:
+        self.__check__()
+        with self.condition:
+            if len(self.frames) > 0:
+                self.skipped += len(self.frames) - 1
+                frames = list(self.frames)
+                for discarded, frame in zip(frames[:-1], frames[1:]): self.__discard__(discarded, frame)
+                self.last = frames[-1]
+                self.frames.clear()
+                self.condition.notify_all()
+        return self.last
+
+    #oldest frame, waiting up to timeout (None waits indefinitely), None if none arrived
+    def get(self, timeout: Optional[float] = None) -> Any:
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.frames) > 0 or self.error != None or not self.running(), timeout)
+            self.__check__()
+            if len(self.frames) == 0: return None
+            self.last = self.frames.popleft()
+            self.condition.notify_all()
+        return self.last
+
+    def statistics(self) -> dict:
+        return {
+            'running': self.running(),
+            'produced': self.produced,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+            'buffered': len(self.frames),
+            'time': float(self.engine.time)
+        }
+
+    def __enter__(self) -> SimulationWorker:
+        return self.start()
+
+    def __exit__(self, *exception) -> None:
+        self.stop()
@@ -1,35 +1,107 @@
 import eel
+from contextlib import nullcontext
 from engine import Vector, Kinematics, Particle, Ensemble, Force, Field, Engine
 from engine.util.typing import Object
 from engine.subatomic import SubatomicEngine
+from engine.stream import Stream
+from engine.worker import SimulationWorker
 
 WEB_ROOT = 'web'
 WEB_FILENAME = 'index.html'
 
 @eel.expose
 def engineBegin() -> None:
-    global subatomic
+    global subatomic, stream
+    engineStop()
     subatomic = SubatomicEngine()
     
     #test
     subatomic.add_proton((0, 0, 0))
     subatomic.add_electron((2e-15, 0, 0))
 
+    #an open stream follows the new engine, its first frame carries the new snapshot
+    if stream != None: stream = Stream(subatomic, stream.encoding)
+
 PLANCK_SECOND = 1e-45
 
+#background simulation, see engineStart
+worker = None
+#frame stream, see engineStream
+stream = None
+
+#held while the worker steps, so direct calls never interleave with it
+def engineLock():
+    return worker.lock if worker != None else nullcontext()
+
 @eel.expose()
 def engineAnimate(t: float) -> None:
-    subatomic.animate(t * PLANCK_SECOND)
+    with engineLock(): subatomic.animate(t * PLANCK_SECOND)
+
+@eel.expose
+def engineRun(t: float, steps: int) -> None:
+    with engineLock(): subatomic.run(steps, t * PLANCK_SECOND)
 
 @eel.expose
 def getEngine() -> dict:
-    return subatomic.dumps()
+    with engineLock(): return subatomic.dumps()
 
 @eel.expose
 def getEngineAndAnimate(t: float) -> dict:
     engineAnimate(t)
     return getEngine()
 
+#streamed frames (see engine.stream, decoded by EngineStream in web/js/eel.js)
+@eel.expose
+def engineStream(encoding: str = 'float32') -> dict:
+    global stream
+    stream = Stream(subatomic, encoding)
+    with engineLock(): return stream.frame()
+
+@eel.expose
+def getEngineFrame() -> dict:
+    if stream == None: raise RuntimeError('no frame stream, call engineStream first')
+    with engineLock(): return stream.frame()
+
+@eel.expose
+def getEngineFrameAndAnimate(t: float) -> dict:
+    engineAnimate(t)
+    return getEngineFrame()
+
+#simulation at its own rate, the browser polls getEngineLatestFrame
+@eel.expose
+def engineStart(t: float, steps: int = 1, policy: str = 'drop-oldest', rate: float = None) -> None:
+    global worker
+    engineStop()
+    worker = SimulationWorker(subatomic, t * PLANCK_SECOND, steps, policy = policy, rate = rate).start()
+
+@eel.expose
+def engineStop() -> None:
+    global worker
+    if worker != None: worker.stop()
+    worker = None
+
+#None while no worker runs
+@eel.expose
+def getEngineLatestFrame() -> dict:
+    return worker.latest() if worker != None else None
+
+@eel.expose
+def getEngineWorker() -> dict:
+    return worker.statistics() if worker != None else {'running': False}
+
+#per-phase timings, pair counts and allocations (see engine.profile), polled live by the front end
+@eel.expose
+def engineProfile(enabled: bool = True) -> None:
+    with engineLock():
+        if enabled: subatomic.start_profiling()
+        else: subatomic.stop_profiling()
+
+@eel.expose
+def getEngineStatistics() -> dict:
+    with engineLock():
+        profiler = subatomic.profiler
+        return profiler.statistics() if profiler != None else None
+
 if __name__ == '__main__':
     eel.init(WEB_ROOT)
     eel.start(WEB_FILENAME, port = 8000)
\ No newline at end of file
@@ -1,5 +1,100 @@
-from engine import Vector, Engine
+from os import path
+from tempfile import TemporaryDirectory
+from engine import Vector, Engine, index_for_object
 from engine.formula import gravity, electrostatic
+from engine.subatomic import SubatomicEngine
+try: import numpy
+except ImportError: numpy = None
+
+#assertion checks, run after the demo (store, checkpoint and solver ones only with numpy installed)
+
+#restored engines step exactly like the originals, including particles of a removed ensemble
+def check_checkpoint() -> None:
+    for options in ({}, {'numeric': 'float', 'store': True}):
+        engine = SubatomicEngine(**options)
+        engine.add_proton((1e-15, 0, 0))
+        engine.add_electron((0, 0, 0))
+        engine.remove_ensemble('proton')
+        engine.animate(1e-22)
+        with TemporaryDirectory() as directory:
+            engine.checkpoint(path.join(directory, 'checkpoint.npz'))
+            restored = Engine.restore(path.join(directory, 'checkpoint.npz'))
+        assert [index_for_object(object).ensemble.name for object in restored.objects.values()] == ['proton', 'electron']
+        assert restored.proton_ensemble.name == 'proton'
+        engine.animate(1e-22)
+        restored.animate(1e-22)
+        assert restored.dumps_dynamic() == engine.dumps_dynamic(), options
+
+#decimal, float and store engines agree to float64 rounding, over steps where the forces move particles by ~2%
+def check_parity() -> None:
+    configurations = [{}, {'numeric': 'float'}]
+    if numpy != None: configurations += [{'store': True}, {'numeric': 'float', 'store': True}]
+    positions = []
+    for options in configurations:
+        engine = SubatomicEngine(**options)
+        engine.add_proton((0, 0, 0))
+        engine.add_electron((5e-11, 0, 0))
+        engine.add_neutron((0, 3e-11, 1e-11))
+        engine.add_electron((-4e-11, 2e-11, 0))
+        engine.run(20, 1e-13)
+        positions.append([float(scalar) for position in engine.dumps_dynamic()['position'] for scalar in position])
+    scale = max([abs(scalar) for scalar in positions[0]])
+    for options, position in zip(configurations[1:], positions[1:]):
+        error = max([abs(a - b) for a, b in zip(position, positions[0])]) / scale
+        assert error < 1e-12, (options, error)
+
+#bulk removal leaves the same engine as one-by-one removal, and an unknown id leaves it untouched
+def check_bulk_remove() -> None:
+    configurations = [{}, {'numeric': 'float'}]
+    if numpy != None: configurations.append({'numeric': 'float', 'store': True})
+    for options in configurations:
+        engines = []
+        for bulk in (True, False):
+            engine = SubatomicEngine(**options)
+            particles = [engine.add_proton((i * 1e-11, 0, 0)) if i % 2 == 0 else engine.add_electron((i * 1e-11, 1e-11, 0)) for i in range(8)]
+            ids = [particle.id for particle in particles]
+            removed = [ids[5], ids[0], ids[3], ids[5]]
+            #a repeated id, and a particle in place of its id
+            if bulk: engine.remove_particles([ids[5], particles[0], ids[3], particles[5]])
+            else:
+                for id in dict.fromkeys(removed): engine.remove_particle(id)
+            engine.run(3, 1e-19)
+            engines.append(engine)
+        bulk, single = engines
+        assert list(bulk.objects) == list(single.objects) == [id for id in ids if id not in removed]
+        #by id, as store rows are compacted in order by bulk removal but swapped with the last one by single removal
+        positions = [dict(zip(dynamic['ids'], dynamic['position'])) for dynamic in (bulk.dumps_dynamic(), single.dumps_dynamic())]
+        for id, position in positions[0].items():
+            for a, b in zip(position, positions[1][id]): assert abs(float(a) - float(b)) <= 1e-12 * max(abs(float(a)), 1e-11), options
+        before = bulk.dumps_dynamic()
+        try: bulk.remove_particles([ids[1], 'u-unknown'])
+        except KeyError: pass
+        else: raise AssertionError('unknown id removed')
+        assert bulk.dumps_dynamic() == before and len(bulk.objects) == 5
+        if bulk.store != None: assert bulk.store.size == 5 and bulk.store.ids == list(bulk.objects)
+
+#Barnes-Hut against brute force, compiled and NumPy walks alike, and refused where it cannot apply
+def check_barnes_hut() -> None:
+    from engine import Field
+    from engine.solver import BarnesHut
+    from engine.formula.kernel import InverseSquareKernel
+    rng = numpy.random.default_rng(0)
+    position = rng.normal(size = (2000, 3))
+    magnitude = rng.choice([1.0, -1.0], 2000)
+    for kernel in (InverseSquareKernel(2.0), InverseSquareKernel(2.0, jit = False)):
+        field = Field('g-1', 'electrostatic', kernel = kernel)
+        exact = kernel.pairwise(position, magnitude)
+        rms = numpy.sqrt((exact ** 2).sum(axis = 1).mean())
+        #theta 0 opens every node
+        assert numpy.allclose(BarnesHut(0).solve(field, position, magnitude), exact, rtol = 1e-9, atol = 1e-9 * rms)
+        error = numpy.linalg.norm(BarnesHut(0.5).solve(field, position, magnitude) - exact, axis = 1) / rms
+        assert numpy.median(error) < 0.005 and error.max() < 0.05, error.max()
+    engine = SubatomicEngine()
+    engine.add_proton((0, 0, 0))
+    engine.electrostatic_field.solver = BarnesHut()
+    try: engine.animate(1e-22)
+    except ValueError: pass
+    else: raise AssertionError('Barnes-Hut on an object engine')
 
 if __name__ == '__main__':
     engine = Engine()
@@ -58,4 +153,11 @@ if __name__ == '__main__':
     # electrostatic_force_vector = electrostatic(proton, neutron, electrostatic_field)
 
     engine.animate()
-    print(engine)
\ No newline at end of file
+    print(engine)
+
+    check_parity()
+    check_bulk_remove()
+    if numpy != None:
+        check_checkpoint()
+        check_barnes_hut()
+    print('checks passed')
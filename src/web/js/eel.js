@@ -0,0 +1,49 @@
+//decodes engine.stream frames, positions and velocities as (n, d) row-major Float64Arrays
+class EngineStream {
+    constructor() {
+        this.snapshot = null;
+        this.time = 0;
+        this.position = null;
+        this.velocity = null;
+    }
+
+    static buffer(data) {
+        const binary = atob(data);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+        return bytes.buffer;
+    }
+
+    decode(channel, previous) {
+        const buffer = EngineStream.buffer(channel.data);
+        const d = this.snapshot.dimensionality;
+        switch (channel.encoding) {
+            case 'float32': return Float64Array.from(new Float32Array(buffer));
+            case 'keyframe': return new Float64Array(buffer);
+            case 'quantized': {
+                const quanta = new Int16Array(buffer);
+                const output = new Float64Array(quanta.length);
+                for (let i = 0; i < quanta.length; i++) output[i] = quanta[i] * channel.scale[i % d] + channel.offset[i % d];
+                return output;
+            }
+            case 'delta': {
+                //deltas apply to the previous reconstruction, in place
+                const quanta = new Int16Array(buffer);
+                for (let i = 0; i < quanta.length; i++) previous[i] += quanta[i] * channel.scale[i % d];
+                return previous;
+            }
+        }
+        throw new Error(`unknown frame encoding ${channel.encoding}`);
+    }
+
+    update(frame) {
+        if (frame.snapshot) {
+            this.snapshot = frame.snapshot;
+            this.position = this.velocity = null;
+        }
+        this.time = frame.time;
+        this.position = this.decode(frame.position, this.position);
+        if (frame.velocity) this.velocity = this.decode(frame.velocity, this.velocity);
+        return this;
+    }
+}